@@ -22,10 +22,12 @@ bl_info = {
 def register():
     """Register all components of the addon"""
     ws_handler.register()
+    template_wizard.register()
 
 
 def unregister():
     """Unregister all components of the addon"""
+    template_wizard.unregister()
     ws_handler.unregister()
 
 
@@ -1,6 +1,7 @@
 import bpy
 import mathutils
 from .preview_renderer import get_preview_renderer
+from .controllable_index import controllable_index
 
 
 class BlenderControllers:
@@ -8,8 +9,8 @@ class BlenderControllers:
     def set_active_camera(camera_name):
         """Set a specific camera as active in the scene"""
         try:
-            camera = bpy.data.objects.get(camera_name)
-            if camera and camera.type == 'CAMERA':
+            camera = controllable_index.get_object(camera_name, 'CAMERA')
+            if camera:
                 bpy.context.scene.camera = camera
                 for area in bpy.context.screen.areas:
                     if area.type == 'VIEW_3D':
@@ -25,9 +26,8 @@ class BlenderControllers:
     def update_light(light_name, color=None, strength=None):
         """Update light properties such as color, strength."""
         try:
-            light_object = bpy.data.objects.get(light_name)
-            if light_object and light_object.type == 'LIGHT':
-                light_data = light_object.data
+            light_data = controllable_index.get_light(light_name)
+            if light_data:
 
                 if color is not None:
                     if isinstance(color, str):
@@ -48,21 +48,17 @@ class BlenderControllers:
     def update_material(material_name, color=None, roughness=None, metallic=None):
         """Update material properties like color, roughness, and metallic"""
         try:
-            material = bpy.data.materials.get(material_name)
-            if material:
-                principled_node = next(
-                    (node for node in material.node_tree.nodes if node.type == 'BSDF_PRINCIPLED'), None)
-
-                if principled_node:
-                    if color is not None:
-                        principled_node.inputs['Base Color'].default_value = color
-                    if roughness is not None:
-                        principled_node.inputs['Roughness'].default_value = roughness
-                    if metallic is not None:
-                        principled_node.inputs['Metallic'].default_value = metallic
+            inputs = controllable_index.get_principled_inputs(material_name)
+            if inputs:
+                if color is not None:
+                    inputs['Base Color'].default_value = color
+                if roughness is not None:
+                    inputs['Roughness'].default_value = roughness
+                if metallic is not None:
+                    inputs['Metallic'].default_value = metallic
 
                 return True
-            return False
+            return bpy.data.materials.get(material_name) is not None
         except Exception as e:
             print(f"Error updating material: {e}")
             return False
@@ -71,7 +67,7 @@ class BlenderControllers:
     def update_object(object_name, location=None, rotation=None, scale=None):
         """Update object properties like location, rotation, and scale"""
         try:
-            obj = bpy.data.objects.get(object_name)
+            obj = controllable_index.get_object(object_name)
             if obj:
                 if location is not None:
                     obj.location = mathutils.Vector(location)
@@ -86,6 +82,162 @@ class BlenderControllers:
             print(f"Error updating object: {e}")
             return False
 
+    @staticmethod
+    def _parse_color(value, size):
+        """Hex string or float sequence to a tuple of `size` floats (alpha defaults to 1)"""
+        if isinstance(value, str):
+            value = value.lstrip('#')
+            if len(value) not in (6, 8):
+                raise ValueError(f"Invalid hex color: #{value}")
+            value = [int(value[i:i+2], 16) / 255.0 for i in range(0, len(value), 2)]
+        values = [float(component) for component in value]
+        if len(values) == 3 and size == 4:
+            values.append(1.0)
+        if len(values) != size:
+            raise ValueError(f"Expected {size} color components, got {len(values)}")
+        return tuple(values)
+
+    @staticmethod
+    def _parse_vector(value):
+        values = tuple(float(component) for component in value)
+        if len(values) != 3:
+            raise ValueError(f"Expected 3 components, got {len(values)}")
+        return values
+
+    @staticmethod
+    def _differs(current, new, tolerance=1e-6):
+        if isinstance(new, tuple):
+            return any(abs(a - b) > tolerance for a, b in zip(current, new))
+        if isinstance(new, float):
+            return abs(current - new) > tolerance
+        return current != new
+
+    @staticmethod
+    def _plan_scene_config(config):
+        """
+        Resolve and validate every item of a scene configuration without
+        changing anything. Returns a list of (result, changes) where changes
+        are (owner, attribute, value, field) for the values that actually differ.
+        """
+        plan = []
+
+        def add(item_type, name, resolve):
+            result = {'type': item_type, 'name': name}
+            try:
+                changes = resolve()
+            except (LookupError, TypeError, ValueError) as e:
+                result.update(status='failed', error=str(e))
+                plan.append((result, []))
+                return
+            changes = [change for change in changes
+                       if BlenderControllers._differs(getattr(change[0], change[1]), change[2])]
+            result['status'] = 'applied' if changes else 'unchanged'
+            result['changed'] = [field for _, _, _, field in changes]
+            plan.append((result, changes))
+
+        def as_list(section):
+            value = config.get(section) or []
+            return [value] if isinstance(value, dict) else value
+
+        camera = config.get('camera')
+        if camera:
+            def resolve_camera():
+                camera_object = controllable_index.get_object(camera.get('camera_name'), 'CAMERA')
+                if not camera_object:
+                    raise LookupError(f"Camera not found: {camera.get('camera_name')}")
+                return [(bpy.context.scene, 'camera', camera_object, 'camera_name')]
+            add('camera', camera.get('camera_name'), resolve_camera)
+
+        for light in as_list('lights'):
+            def resolve_light(light=light):
+                light_data = controllable_index.get_light(light.get('light_name'))
+                if not light_data:
+                    raise LookupError(f"Light not found: {light.get('light_name')}")
+                changes = []
+                if light.get('color') is not None:
+                    changes.append((light_data, 'color',
+                                    BlenderControllers._parse_color(light['color'], 3), 'color'))
+                if light.get('strength') is not None:
+                    changes.append((light_data, 'energy', float(light['strength']), 'strength'))
+                return changes
+            add('light', light.get('light_name'), resolve_light)
+
+        for material in as_list('materials'):
+            def resolve_material(material=material):
+                inputs = controllable_index.get_principled_inputs(material.get('material_name'))
+                if not inputs:
+                    if not bpy.data.materials.get(material.get('material_name')):
+                        raise LookupError(f"Material not found: {material.get('material_name')}")
+                    raise LookupError(
+                        f"Material has no Principled BSDF: {material.get('material_name')}")
+                changes = []
+                if material.get('color') is not None:
+                    changes.append((inputs['Base Color'], 'default_value',
+                                    BlenderControllers._parse_color(material['color'], 4), 'color'))
+                if material.get('roughness') is not None:
+                    changes.append((inputs['Roughness'], 'default_value',
+                                    float(material['roughness']), 'roughness'))
+                if material.get('metallic') is not None:
+                    changes.append((inputs['Metallic'], 'default_value',
+                                    float(material['metallic']), 'metallic'))
+                return changes
+            add('material', material.get('material_name'), resolve_material)
+
+        for obj in as_list('objects'):
+            def resolve_object(obj=obj):
+                blender_object = controllable_index.get_object(obj.get('object_name'))
+                if not blender_object:
+                    raise LookupError(f"Object not found: {obj.get('object_name')}")
+                changes = []
+                for field, attribute in (('location', 'location'),
+                                         ('rotation', 'rotation_euler'),
+                                         ('scale', 'scale')):
+                    if obj.get(field) is not None:
+                        changes.append((blender_object, attribute,
+                                        BlenderControllers._parse_vector(obj[field]), field))
+                return changes
+            add('object', obj.get('object_name'), resolve_object)
+
+        return plan
+
+    @staticmethod
+    def apply_scene_config(config, atomic=True):
+        """
+        Validate and apply a whole scene configuration in one pass.
+
+        Values that already match are skipped. With atomic set, nothing is
+        applied unless every item is valid; otherwise valid items are applied
+        and invalid ones reported. Returns an aggregated result with the
+        status of every item ('applied', 'unchanged', 'failed' or 'skipped').
+        """
+        plan = BlenderControllers._plan_scene_config(config or {})
+        failed = [result for result, _ in plan if result['status'] == 'failed']
+        apply_changes = not (atomic and failed)
+
+        camera_changed = False
+        for result, changes in plan:
+            if not apply_changes and result['status'] == 'applied':
+                result['status'] = 'skipped'
+                continue
+            for owner, attribute, value, _ in changes:
+                setattr(owner, attribute, value)
+                camera_changed = camera_changed or attribute == 'camera'
+
+        if camera_changed:
+            for area in bpy.context.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.spaces[0].region_3d.view_perspective = 'CAMERA'
+                    break
+
+        items = [result for result, _ in plan]
+        counts = {status: sum(1 for item in items if item['status'] == status)
+                  for status in ('applied', 'unchanged', 'failed', 'skipped')}
+        return {
+            'success': not failed,
+            **counts,
+            'items': items,
+        }
+
     @staticmethod
     def create_preview_renderer(username):
         """Create and return a preview renderer instance with the given username"""
@@ -0,0 +1,84 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_TTL = 600.0
+DEFAULT_CAPACITY = 4096
+
+
+class CommandDedupeStore:
+    """
+    Remembers recently processed (command, message_id) pairs.
+
+    Entries expire after `ttl` seconds and the store holds at most
+    `capacity` of them, dropping the least recently seen first, so a long
+    running Blender instance keeps a constant footprint. Lookups and inserts
+    are O(1); expired entries are purged from the old end of the order.
+    """
+
+    def __init__(self, ttl=None, capacity=None, clock=time.monotonic):
+        self.ttl = float(ttl or os.environ.get("CR8_COMMAND_DEDUPE_TTL", DEFAULT_TTL))
+        self.capacity = int(capacity or os.environ.get(
+            "CR8_COMMAND_DEDUPE_CAPACITY", DEFAULT_CAPACITY))
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> time last seen, oldest first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _purge_expired(self, now):
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if now - seen_at < self.ttl:
+                break
+            del self._entries[key]
+            self.expired += 1
+
+    def seen(self, key):
+        """True if key was processed within the TTL; counts a hit or miss"""
+        with self._lock:
+            now = self._clock()
+            self._purge_expired(now)
+            if key in self._entries:
+                self._entries[key] = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        """Record key as processed now"""
+        with self._lock:
+            now = self._clock()
+            self._purge_expired(now)
+            self._entries[key] = now
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            self._purge_expired(self._clock())
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
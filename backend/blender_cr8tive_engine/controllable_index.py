@@ -0,0 +1,226 @@
+import logging
+import bpy
+from bpy.app.handlers import persistent
+
+
+CONTROLLABLE_PREFIX = 'controllable_'
+
+PRINCIPLED_INPUTS = ('Base Color', 'Roughness', 'Metallic')
+
+# bpy.data collections scanned for controllables
+CONTROLLABLE_COLLECTIONS = ('cameras', 'lights', 'materials', 'objects')
+
+
+def _is_valid(datablock, name):
+    """True while a cached reference still points at the datablock called name"""
+    try:
+        return datablock.name == name
+    except ReferenceError:
+        return False
+
+
+def _is_current_node(material, node_name, node):
+    """True while the material's node tree still holds node under node_name"""
+    try:
+        # bpy structs compare by pointer, a node deleted and another added
+        # under the same name is a different node
+        return material.node_tree is not None and material.node_tree.nodes.get(node_name) == node
+    except ReferenceError:
+        return False
+
+
+class ControllableIndex:
+    """
+    Name lookups for the datablocks the controllers update.
+
+    Objects are indexed by name, and materials by name to their Principled
+    BSDF input sockets, so an update resolves its target without walking
+    bpy.data or a node tree. The set of controllables is cached for rescans.
+    Entries are checked for validity when used and the index is kept current
+    from depsgraph updates: datablocks it does not know, or a change in the
+    size of a collection, mark it stale and it is rebuilt on the next lookup.
+    Loading a file or undoing drops it entirely, as references do not
+    survive either.
+    """
+
+    def __init__(self):
+        self._objects = None
+        # material name -> (material, node name, node, {input name: socket})
+        self._materials = {}
+        self._controllables = None
+        self._controllable_names = set()
+        self._sizes = None
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.invalidations = 0
+
+    def start(self):
+        """Register the update handlers; call from the main thread"""
+        for handlers, handler in self._handlers():
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def stop(self):
+        for handlers, handler in self._handlers():
+            if handler in handlers:
+                handlers.remove(handler)
+        self.invalidate()
+
+    @staticmethod
+    def _handlers():
+        return (
+            (bpy.app.handlers.depsgraph_update_post, _on_depsgraph_update),
+            (bpy.app.handlers.load_post, _on_reset),
+            (bpy.app.handlers.undo_post, _on_reset),
+            (bpy.app.handlers.redo_post, _on_reset),
+        )
+
+    def invalidate(self):
+        self._objects = None
+        self._materials = {}
+        self._controllables = None
+        self._controllable_names = set()
+        self._sizes = None
+        self.invalidations += 1
+
+    @staticmethod
+    def _collection_sizes():
+        return tuple(len(getattr(bpy.data, collection))
+                     for collection in CONTROLLABLE_COLLECTIONS)
+
+    def _check_sizes(self):
+        """Anything added or removed changes a collection size"""
+        sizes = self._collection_sizes()
+        if sizes != self._sizes:
+            if self._sizes is not None:
+                self.invalidate()
+            self._sizes = sizes
+
+    def _object_map(self):
+        self._check_sizes()
+        if self._objects is None:
+            self._objects = {obj.name: obj for obj in bpy.data.objects}
+            self.builds += 1
+        return self._objects
+
+    def get_object(self, name, object_type=None):
+        """The object called name (of object_type, if given) or None"""
+        if not name:
+            return None
+        objects = self._object_map()
+        obj = objects.get(name)
+        if obj is not None and _is_valid(obj, name):
+            self.hits += 1
+        else:
+            # Renamed or created since the last build
+            self.misses += 1
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                objects.pop(name, None)
+                return None
+            objects[name] = obj
+        if object_type and obj.type != object_type:
+            return None
+        return obj
+
+    def get_light(self, name):
+        """The light data of the light object called name, or None"""
+        light_object = self.get_object(name, 'LIGHT')
+        return light_object.data if light_object else None
+
+    def get_principled_inputs(self, material_name):
+        """
+        The Principled BSDF input sockets of a material by input name, or
+        None when the material or its Principled BSDF does not exist
+        """
+        if not material_name:
+            return None
+        self._check_sizes()
+        entry = self._materials.get(material_name)
+        if entry is not None:
+            material, node_name, node, inputs = entry
+            # The Principled BSDF may have been deleted, or replaced by another
+            if _is_valid(material, material_name) and _is_current_node(material, node_name, node):
+                self.hits += 1
+                return inputs
+
+        self.misses += 1
+        self._materials.pop(material_name, None)
+        material = bpy.data.materials.get(material_name)
+        if not material or not material.node_tree:
+            return None
+        principled_node = next(
+            (node for node in material.node_tree.nodes if node.type == 'BSDF_PRINCIPLED'), None)
+        if not principled_node:
+            return None
+        inputs = {name: principled_node.inputs[name] for name in PRINCIPLED_INPUTS}
+        self._materials[material_name] = (material, principled_node.name, principled_node, inputs)
+        return inputs
+
+    def controllables(self):
+        """The controllable datablocks, as {bpy.data collection name: [datablock]}"""
+        self._check_sizes()
+        if self._controllables is None or not all(
+                _is_valid(datablock, name)
+                for datablocks in self._controllables.values()
+                for name, datablock in datablocks):
+            self._controllables = {
+                collection: [(datablock.name, datablock)
+                             for datablock in getattr(bpy.data, collection)
+                             if datablock.name.startswith(CONTROLLABLE_PREFIX)]
+                for collection in CONTROLLABLE_COLLECTIONS
+            }
+            self._controllable_names = {
+                name for datablocks in self._controllables.values() for name, _ in datablocks}
+            self.builds += 1
+        return {collection: [datablock for _, datablock in datablocks]
+                for collection, datablocks in self._controllables.items()}
+
+    def on_depsgraph_update(self, depsgraph):
+        """Mark the index stale when a datablock it does not know was updated"""
+        if self._objects is None and self._controllables is None:
+            return
+        self._check_sizes()
+        for update in depsgraph.updates:
+            datablock = update.id.original
+            if isinstance(datablock, bpy.types.Object):
+                known = self._objects is None or datablock.name in self._objects
+            elif isinstance(datablock, (bpy.types.Material, bpy.types.Light, bpy.types.Camera)):
+                known = (self._controllables is None
+                         or not datablock.name.startswith(CONTROLLABLE_PREFIX)
+                         or datablock.name in self._controllable_names)
+            else:
+                continue
+            if not known:
+                logging.debug(f"Controllable index stale after update of {datablock.name}")
+                self.invalidate()
+                self._sizes = self._collection_sizes()
+                return
+
+    def stats(self):
+        return {
+            'objects': len(self._objects or {}),
+            'materials': len(self._materials),
+            'hits': self.hits,
+            'misses': self.misses,
+            'builds': self.builds,
+            'invalidations': self.invalidations,
+        }
+
+
+controllable_index = ControllableIndex()
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    try:
+        controllable_index.on_depsgraph_update(depsgraph)
+    except Exception as e:
+        logging.error(f"Error updating the controllable index: {e}")
+        controllable_index.invalidate()
+
+
+@persistent
+def _on_reset(*args):
+    controllable_index.invalidate()
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+
+
+class FrameManifest:
+    """
+    Append-only record of the preview frames written by a render.
+
+    Each line is a JSON object. A render starts with a 'begin' record, adds
+    one 'frame' record after each frame file is completely written and ends
+    with an 'end' record. Every record carries the render generation id so
+    readers can ignore lines of an older render.
+    """
+
+    FILE_NAME = "manifest.jsonl"
+
+    def __init__(self, preview_dir):
+        self.path = Path(preview_dir) / self.FILE_NAME
+        self.generation = None
+        self.frames_written = 0
+        # Frame records of the current render, in order
+        self.frames = []
+
+    def begin(self, generation, render_info):
+        """Start a new manifest for a render, replacing the previous one"""
+        self.generation = str(generation)
+        self.frames_written = 0
+        self.frames = []
+        # Replace rather than truncate, readers detect the new file by its inode
+        temp_path = self.path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            self._write(f, {
+                'type': 'begin',
+                'generation': self.generation,
+                'started_at': time.time(),
+                **render_info
+            })
+        os.replace(temp_path, self.path)
+
+    def record_frame(self, frame_number, frame_path, render_ms):
+        """Append a frame record once the frame file is completely written"""
+        frame_path = Path(frame_path)
+        checksum = hashlib.sha1()
+        with open(frame_path, 'rb') as frame_file:
+            for chunk in iter(lambda: frame_file.read(1024 * 1024), b''):
+                checksum.update(chunk)
+
+        record = {
+            'type': 'frame',
+            'generation': self.generation,
+            'frame': frame_number,
+            'index': self.frames_written,
+            'file': frame_path.name,
+            'size': frame_path.stat().st_size,
+            'sha1': checksum.hexdigest(),
+            'render_ms': round(render_ms, 2),
+        }
+        with open(self.path, 'a') as f:
+            self._write(f, record)
+        self.frames_written += 1
+        self.frames.append(record)
+        return record
+
+    def finish(self, status='completed'):
+        """Close the render with an end record"""
+        try:
+            with open(self.path, 'a') as f:
+                self._write(f, {
+                    'type': 'end',
+                    'generation': self.generation,
+                    'status': status,
+                    'frame_count': self.frames_written,
+                })
+        except OSError as e:
+            logging.error(f"Error finishing frame manifest: {e}")
+
+    @staticmethod
+    def _write(f, record):
+        # One complete line per record, flushed so the server never reads half a line
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,87 @@
+import time
+import logging
+import threading
+from collections import deque
+import bpy
+
+
+class MainThreadExecutor:
+    """
+    Runs work queued from any thread on Blender's main thread.
+
+    A single persistent timer drains a thread-safe queue, spending at most
+    `budget` seconds per tick so the UI keeps redrawing during bursts.
+    Work submitted with a key replaces (or is merged into) work with the
+    same key that has not run yet, so a burst of updates to one target runs
+    once with the latest values.
+    """
+
+    def __init__(self, budget=0.008, idle_interval=0.02):
+        self.budget = budget
+        self.idle_interval = idle_interval
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._pending = {}
+        self.executed = 0
+        self.coalesced = 0
+        # bpy.app.timers matches functions by identity, keep one bound method
+        self._timer = self._drain
+
+    def start(self):
+        """Register the drain timer; call from the main thread"""
+        if not bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.register(self._timer, first_interval=0.0, persistent=True)
+
+    def stop(self):
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+
+    def submit(self, function, args=(), key=None, merge=None):
+        """
+        Queue function(*args). With a key, pending work of the same key is
+        replaced by this call, or merge(old_args, new_args) when given.
+        """
+        with self._lock:
+            entry = self._pending.get(key) if key is not None else None
+            if entry is not None:
+                entry[0] = function
+                entry[1] = merge(entry[1], args) if merge else args
+                self.coalesced += 1
+                return
+
+            entry = [function, args, key]
+            self._queue.append(entry)
+            if key is not None:
+                self._pending[key] = entry
+
+    def _drain(self):
+        deadline = time.perf_counter() + self.budget
+        while True:
+            with self._lock:
+                if not self._queue:
+                    break
+                function, args, key = self._queue.popleft()
+                if key is not None:
+                    self._pending.pop(key, None)
+
+            try:
+                function(*args)
+            except Exception as e:
+                logging.error(f"Error running queued work on the main thread: {e}")
+            self.executed += 1
+
+            if time.perf_counter() >= deadline:
+                break
+
+        # Come straight back while work is waiting, otherwise idle
+        return 0.0 if self._queue else self.idle_interval
+
+    def stats(self):
+        return {
+            'queued': len(self._queue),
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+        }
+
+
+main_thread = MainThreadExecutor()
@@ -0,0 +1,115 @@
+import logging
+import threading
+from collections import deque
+
+
+class OutboundSender:
+    """
+    Sends messages to the server from its own thread.
+
+    Callers only queue a message, encoding and writing to the socket
+    happen on the sender thread, so Blender's main thread never waits on
+    the network. Control messages are sent before bulk ones. A message
+    queued with a key replaces a pending message with the same key, so
+    only the latest progress update of a render is sent. Once the queue
+    is full the oldest bulk message is dropped; control messages are never
+    dropped, their queue grows instead.
+    """
+
+    def __init__(self, write, encode, max_queued=256):
+        # write(payload, binary) sends one encoded message
+        self._write = write
+        # encode(message) returns (payload, binary)
+        self._encode = encode
+        self.max_queued = max_queued
+        self._condition = threading.Condition()
+        self._control = deque()
+        self._bulk = deque()
+        self._pending = {}
+        self._running = False
+        self._thread = None
+        # Bumped on every start, a thread whose run is over exits even when
+        # stop() gave up joining it before the sender was started again
+        self._run_id = 0
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._run_id += 1
+            run_id = self._run_id
+        self._thread = threading.Thread(
+            target=self._run, args=(run_id,), name='cr8-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Stop the sender thread and discard what was not sent"""
+        with self._condition:
+            self._running = False
+            self._control.clear()
+            self._bulk.clear()
+            self._pending.clear()
+            self._condition.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, message, bulk=False, key=None):
+        """Queue a message; never blocks"""
+        with self._condition:
+            entry = self._pending.get(key) if key is not None else None
+            if entry is not None:
+                entry[0] = message
+                self.merged += 1
+                return
+
+            if len(self._control) + len(self._bulk) >= self.max_queued and self._bulk:
+                self._drop_oldest_bulk()
+            entry = [message, key]
+            (self._bulk if bulk else self._control).append(entry)
+            if key is not None:
+                self._pending[key] = entry
+            self._condition.notify()
+
+    def _drop_oldest_bulk(self):
+        message, key = self._bulk.popleft()
+        if key is not None:
+            self._pending.pop(key, None)
+        self.dropped += 1
+        logging.warning(
+            f"Outbound queue full, dropped {message.get('command', 'message')}")
+
+    def _run(self, run_id):
+        while True:
+            with self._condition:
+                while self._run_id == run_id and self._running and not (self._control or self._bulk):
+                    self._condition.wait()
+                if self._run_id != run_id or not self._running:
+                    return
+                message, key = (self._control or self._bulk).popleft()
+                if key is not None:
+                    self._pending.pop(key, None)
+
+            try:
+                payload, binary = self._encode(message)
+                self._write(payload, binary)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Error sending {message.get('command', 'message')}: {e}")
+
+    def stats(self):
+        with self._condition:
+            return {
+                'queued_control': len(self._control),
+                'queued_bulk': len(self._bulk),
+                'sent': self.sent,
+                'merged': self.merged,
+                'dropped': self.dropped,
+                'errors': self.errors,
+            }
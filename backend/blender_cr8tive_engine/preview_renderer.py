@@ -3,6 +3,13 @@ from pathlib import Path
 import bpy
 import mathutils
 import os
+import time
+import uuid
+from .frame_manifest import FrameManifest
+from .video_encoder import StreamingVideoEncoder
+
+# Encoders that may still be finishing the MP4 of a completed render, by preview directory
+_finishing_encoders = {}
 
 
 class PreviewRenderer:
@@ -10,6 +17,13 @@ class PreviewRenderer:
         self.preview_dir = Path(
             f"/mnt/shared_storage/Cr8tive_Engine/Sessions/{username}/preview")
         self.preview_dir.mkdir(exist_ok=True, parents=True)
+        self.manifest = FrameManifest(self.preview_dir)
+        # Optional MP4 encoded while frames are rendered
+        self.encode_video = False
+        self.video_encoder = None
+        self.video_path = None
+        # Called with the MP4 path and its fps from the encoder's thread once it is written
+        self.on_video_ready = None
 
     def setup_preview_render(self, params=None):
         """Setup the preview render with OpenGL viewport settings"""
@@ -38,12 +52,126 @@ class PreviewRenderer:
         render.resolution_y = params.get('resolution_y', 270)
         render.filepath = str(self.preview_dir / "frame_")
         render.image_settings.file_format = 'PNG'
+        self.encode_video = bool(params.get('encode_video', False))
+
+    def get_render_info(self):
+        """Describe the frames the upcoming preview render will write"""
+        scene = bpy.context.scene
+        frame_count = len(
+            range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+        return {
+            'frame_start': scene.frame_start,
+            'frame_end': scene.frame_end,
+            'frame_count': frame_count,
+            'fps': scene.render.fps / scene.render.fps_base,
+        }
+
+    def preview_video_path(self):
+        """Path of the MP4 encoded alongside the preview frames"""
+        return self.preview_dir / "preview.mp4"
+
+    def frame_path(self, frame):
+        """Path of the PNG written for a scene frame"""
+        return self.preview_dir / f"frame_{frame:04d}.png"
+
+    def render_frame(self, frame):
+        """Render a single frame with the viewport renderer and record it in the manifest"""
+        scene = bpy.context.scene
+        start = time.perf_counter()
+
+        scene.frame_set(frame)
+        # Still renders are written to filepath as is, with the extension added
+        scene.render.filepath = str(self.frame_path(frame).with_suffix(''))
+        bpy.ops.render.opengl(write_still=True)
+
+        render_ms = (time.perf_counter() - start) * 1000
+        return self._publish_frame(frame, self.frame_path(frame), render_ms)
+
+    def _publish_frame(self, frame, frame_path, render_ms):
+        """Hand a finished frame file to the video encoder and the manifest"""
+        if self.video_encoder:
+            self.video_encoder.add_frame(frame_path)
+        return self.manifest.record_frame(frame, frame_path, render_ms)
+
+    def _start_video_encoder(self):
+        self.video_path = None
+        self.video_encoder = None
+        if not self.encode_video:
+            return
+        try:
+            encoder = StreamingVideoEncoder(
+                self.preview_video_path(), self.get_render_info()['fps'])
+            encoder.start()
+            self.video_encoder = encoder
+        except OSError as e:
+            # The frames are what the preview needs, the video is a bonus
+            print(f"Could not start video encoder: {e}")
+
+    def _finish_video_encoder(self, status):
+        encoder, self.video_encoder = self.video_encoder, None
+        if not encoder:
+            return
+        if status == 'completed':
+            _finishing_encoders[self.preview_dir] = encoder
+            encoder.finish(lambda video_path: self._video_finished(video_path, encoder.fps))
+        else:
+            encoder.abort()
+
+    def _video_finished(self, video_path, fps):
+        self.video_path = video_path
+        if video_path and self.on_video_ready:
+            self.on_video_ready(video_path, fps)
+
+    def render_frames(self):
+        """Scene frame numbers a preview render covers, in order"""
+        scene = bpy.context.scene
+        return list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+
+    def begin_render(self, generation=None):
+        """Start a new manifest and remember the frame to return to afterwards"""
+        self.original_frame = bpy.context.scene.frame_current
+        self.manifest.begin(generation or uuid.uuid4().hex,
+                            self.get_render_info())
+        self._start_video_encoder()
+
+    def end_render(self, status):
+        """Restore the scene and close the manifest with the render's outcome"""
+        scene = bpy.context.scene
+        scene.frame_set(self.original_frame)
+        scene.render.filepath = str(self.preview_dir / "frame_")
+        self._finish_video_encoder(status)
+        self.manifest.finish(status)
+
+    def render_from_cache(self, render_cache, entry, generation=None):
+        """
+        Publish the frames of a cached render as if they had just been rendered,
+        without touching the renderer
+        """
+        self.manifest.begin(generation or uuid.uuid4().hex,
+                            {**self.get_render_info(), 'cached': True})
+        self._start_video_encoder()
+        status = 'failed'
+        try:
+            render_cache.restore(entry, self.preview_dir)
+            for frame in entry['frames']:
+                self._publish_frame(
+                    frame['frame'], self.preview_dir / frame['file'], 0.0)
+            status = 'completed'
+        finally:
+            self._finish_video_encoder(status)
+            self.manifest.finish(status)
 
     def cleanup(self):
-        """Remove all preview frame files"""
+        """Remove all preview frame files, including encoded copies cached by the server"""
+        encoder = _finishing_encoders.pop(self.preview_dir, None)
+        if encoder:
+            # The video of the previous render would land among the new frames
+            encoder.abort()
         try:
-            for file in self.preview_dir.glob("frame_*.png"):
+            for file in self.preview_dir.glob("frame_*"):
                 file.unlink()
+            self.manifest.path.unlink(missing_ok=True)
+            self.preview_video_path().unlink(missing_ok=True)
         except Exception as e:
             print(f"Error removing file: {e}")
             import traceback
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import queue
+import shutil
+import uuid
+import hashlib
+import logging
+import threading
+from pathlib import Path
+import bpy
+
+
+DEFAULT_CACHE_DIR = "/mnt/shared_storage/Cr8tive_Engine/RenderCache"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 * 1024
+
+
+def _rounded(values, digits=5):
+    return [round(float(value), digits) for value in values]
+
+
+class RenderCache:
+    """
+    Content-addressed cache of preview renders on shared storage.
+
+    A render is keyed by a digest of the blend file, the state every
+    controllable can change (active camera, lights, principled materials,
+    object transforms) and the render settings, so identical requests from
+    any user of the same template reuse one set of frames. Entries live in
+    one directory per digest with an entry.json index; the index mtime is
+    bumped on every hit and the least recently used entries are evicted once
+    the cache grows past its byte budget. Hashing the blend file, storing and
+    evicting run on the cache's own thread, so Blender's main thread never
+    waits on them; renders are not cached until the blend file is hashed.
+    """
+
+    ENTRY_FILE = "entry.json"
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or os.environ.get(
+            "CR8_RENDER_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.max_bytes = int(max_bytes or os.environ.get(
+            "CR8_RENDER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        # ((path, size, mtime), sha1) of the blend file, and the identity being hashed
+        self._blend_digest = None
+        self._hashing = None
+        # Bytes in the cache, scanned once and then counted per stored entry
+        self._cached_bytes = None
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def blend_file_digest(self):
+        """
+        Hash of the blend file contents, or None while the cache thread is
+        hashing this version of the file (identified by size and mtime)
+        """
+        filepath = bpy.data.filepath
+        if not filepath:
+            return "unsaved"
+
+        stat = os.stat(filepath)
+        identity = (filepath, stat.st_size, stat.st_mtime_ns)
+        blend_digest = self._blend_digest
+        if blend_digest and blend_digest[0] == identity:
+            return blend_digest[1]
+        if self._hashing != identity:
+            self._hashing = identity
+            self._submit(self._hash_blend_file, identity)
+        return None
+
+    def _hash_blend_file(self, identity):
+        checksum = hashlib.sha1()
+        with open(identity[0], 'rb') as blend_file:
+            for chunk in iter(lambda: blend_file.read(1024 * 1024), b''):
+                checksum.update(chunk)
+        self._blend_digest = (identity, checksum.hexdigest())
+        logging.info(f"Hashed blend file {identity[0]} for the render cache")
+
+    @staticmethod
+    def scene_state():
+        """Everything the preview controls can change, in a canonical form"""
+        scene = bpy.context.scene
+        materials = {}
+        for material in bpy.data.materials:
+            if not material.use_nodes or not material.node_tree:
+                continue
+            principled = next(
+                (node for node in material.node_tree.nodes if node.type == 'BSDF_PRINCIPLED'), None)
+            if principled:
+                materials[material.name] = {
+                    'color': _rounded(principled.inputs['Base Color'].default_value),
+                    'roughness': round(principled.inputs['Roughness'].default_value, 5),
+                    'metallic': round(principled.inputs['Metallic'].default_value, 5),
+                }
+
+        return {
+            'camera': scene.camera.name if scene.camera else None,
+            'lights': {
+                light.name: {'color': _rounded(light.color), 'energy': round(light.energy, 5)}
+                for light in bpy.data.lights
+            },
+            'materials': materials,
+            'objects': {
+                obj.name: {
+                    'location': _rounded(obj.location),
+                    'rotation': _rounded(obj.rotation_euler),
+                    'scale': _rounded(obj.scale),
+                }
+                for obj in scene.objects
+            },
+        }
+
+    @staticmethod
+    def render_settings():
+        scene = bpy.context.scene
+        render = scene.render
+        return {
+            'engine': render.engine,
+            'resolution': [render.resolution_x, render.resolution_y,
+                           render.resolution_percentage],
+            'frames': [scene.frame_start, scene.frame_end, scene.frame_step],
+            'fps': [render.fps, render.fps_base],
+            'film_transparent': render.film_transparent,
+            'file_format': render.image_settings.file_format,
+        }
+
+    def digest(self):
+        """Cache key of a render of the scene as it is now, None until the blend file is hashed"""
+        blend_digest = self.blend_file_digest()
+        if blend_digest is None:
+            return None
+        key = {
+            'blend': blend_digest,
+            'scene': self.scene_state(),
+            'render': self.render_settings(),
+        }
+        canonical = json.dumps(key, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+
+    def lookup(self, key):
+        """Return the entry of a cached render and mark it as recently used"""
+        entry_path = self._entry_dir(key) / self.ENTRY_FILE
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._submit(os.utime, entry_path)
+        entry['path'] = str(entry_path.parent)
+        return entry
+
+    def restore(self, entry, preview_dir):
+        """Link (or copy) the cached frames into the preview directory"""
+        source_dir = Path(entry['path'])
+        for frame in entry['frames']:
+            source = source_dir / frame['file']
+            target = Path(preview_dir) / frame['file']
+            target.unlink(missing_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+    def store(self, key, preview_dir, frames, render_info):
+        """Queue a completed render to be copied into the cache; never blocks"""
+        self._submit(self._store_and_evict, key, Path(preview_dir),
+                     [dict(frame) for frame in frames], dict(render_info))
+
+    def _submit(self, function, *args):
+        """Run function(*args) on the cache thread"""
+        self._jobs.put((function, args))
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='cr8-render-cache', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            function, args = self._jobs.get()
+            try:
+                function(*args)
+            except Exception as e:
+                logging.error(f"Render cache error in {function.__name__}: {e}")
+
+    def _store_and_evict(self, key, preview_dir, frames, render_info):
+        size = self._store(key, preview_dir, frames, render_info)
+        if self._cached_bytes is None:
+            self.evict()
+            return
+        self._cached_bytes += size
+        if self._cached_bytes > self.max_bytes:
+            self.evict()
+
+    @staticmethod
+    def _copy_frame(source, target, sha1):
+        """Copy a frame file, False if it no longer holds the frame that was rendered"""
+        checksum = hashlib.sha1()
+        with open(source, 'rb') as source_file, open(target, 'wb') as target_file:
+            for chunk in iter(lambda: source_file.read(1024 * 1024), b''):
+                checksum.update(chunk)
+                target_file.write(chunk)
+        return checksum.hexdigest() == sha1
+
+    def _store(self, key, preview_dir, frames, render_info):
+        """
+        Copy a completed render into the cache and return the bytes added.
+        Another instance may store the same key concurrently; the first
+        complete entry wins. The next render may replace the frames while
+        they are copied, the checksums of the manifest tell and the entry is
+        dropped.
+        """
+        entry_dir = self._entry_dir(key)
+        if (entry_dir / self.ENTRY_FILE).exists():
+            return 0
+
+        staging_dir = entry_dir.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            staging_dir.mkdir(parents=True)
+            size = 0
+            for frame in frames:
+                target = staging_dir / frame['file']
+                if not self._copy_frame(preview_dir / frame['file'], target, frame['sha1']):
+                    logging.info(f"Frames of render {key} were replaced, not caching it")
+                    return 0
+                size += target.stat().st_size
+
+            with open(staging_dir / self.ENTRY_FILE, 'w') as f:
+                json.dump({
+                    'key': key,
+                    'created_at': time.time(),
+                    'size': size,
+                    'render_info': render_info,
+                    'frames': [
+                        {'frame': frame['frame'], 'file': frame['file'],
+                         'render_ms': frame['render_ms']}
+                        for frame in frames
+                    ],
+                }, f)
+
+            # Renaming a directory is atomic, readers never see a partial entry
+            os.rename(staging_dir, entry_dir)
+            return size
+        except OSError as e:
+            logging.warning(f"Could not store render {key} in the cache: {e}")
+            return 0
+        finally:
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits its budget.
+        Scans the whole cache, which other instances also write to, so it
+        only runs once the running total of this instance passes the budget.
+        """
+        entries = []
+        total = 0
+        for entry_path in self.root.glob(f"*/*/{self.ENTRY_FILE}"):
+            try:
+                with open(entry_path) as f:
+                    size = json.load(f).get('size', 0)
+                last_used = entry_path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, size, entry_path.parent))
+            total += size
+
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted cached render {entry_dir.name}")
+        self._cached_bytes = total
+
+
+# One cache per Blender instance, all instances share the same storage
+render_cache = RenderCache()
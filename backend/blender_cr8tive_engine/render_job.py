@@ -0,0 +1,100 @@
+import time
+import logging
+import bpy
+
+
+class RenderJob:
+    """
+    A preview render that renders one frame per bpy.app.timers tick.
+
+    Between ticks Blender's main thread is free to process other commands,
+    so a newer request can cancel a running job instead of waiting for it.
+    Callbacks run on the main thread: on_progress after every frame and
+    on_finished once, with status 'completed', 'cancelled' or 'failed'.
+    """
+
+    def __init__(self, renderer, generation=None, on_progress=None, on_finished=None):
+        self.renderer = renderer
+        self.generation = generation
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.frames = []
+        self.position = 0
+        self.status = None
+        self.total_ms = 0.0
+        self.last_frame_ms = 0.0
+        self.started_at = None
+        # bpy.app.timers matches functions by identity, keep one bound method
+        self._timer = self._tick
+
+    @property
+    def active(self):
+        return self.status is None and self.started_at is not None
+
+    def start(self):
+        self.frames = self.renderer.render_frames()
+        self.renderer.begin_render(self.generation)
+        self.started_at = time.perf_counter()
+        if not self.frames:
+            self._finish('completed')
+            return
+        bpy.app.timers.register(self._timer, first_interval=0.0)
+
+    def cancel(self):
+        """Stop after the frame being rendered; returns False if the job already ended"""
+        if not self.active:
+            return False
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        self._finish('cancelled')
+        return True
+
+    def progress(self):
+        done = self.position
+        total = len(self.frames)
+        ms_per_frame = self.total_ms / done if done else 0.0
+        return {
+            'render_id': self.generation,
+            'status': self.status or 'rendering',
+            'frame': self.frames[done - 1] if done else None,
+            'frames_done': done,
+            'total_frames': total,
+            'ms_per_frame': round(ms_per_frame, 2),
+            'last_frame_ms': round(self.last_frame_ms, 2),
+            'eta_ms': round(ms_per_frame * (total - done), 2),
+        }
+
+    def _tick(self):
+        if not self.active:
+            return None
+
+        try:
+            record = self.renderer.render_frame(self.frames[self.position])
+        except Exception as e:
+            logging.error(f"Error rendering preview frame: {e}")
+            self._finish('failed')
+            return None
+
+        self.position += 1
+        self.last_frame_ms = record['render_ms']
+        self.total_ms += record['render_ms']
+        if self.on_progress:
+            try:
+                self.on_progress(self)
+            except Exception as e:
+                logging.error(f"Error reporting render progress: {e}")
+
+        if self.position >= len(self.frames):
+            self._finish('completed')
+            return None
+        # Run again as soon as Blender has handled whatever else is queued
+        return 0.0
+
+    def _finish(self, status):
+        self.status = status
+        try:
+            self.renderer.end_render(status)
+        except Exception as e:
+            logging.error(f"Error finishing preview render: {e}")
+        if self.on_finished:
+            self.on_finished(self)
@@ -1,7 +1,41 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
 import bpy
+from .controllable_index import controllable_index
+
+
+CONTROLLABLE_CATEGORIES = ('cameras', 'lights', 'materials', 'objects')
+
+# Prefix of the stdout line carrying the metadata of an ingested template
+INGEST_MARKER = 'CR8_TEMPLATE_METADATA'
 
 
 class TemplateWizard:
+    """
+    Scans templates for controllables and tracks how they change.
+
+    Every rescan that finds a difference bumps `version`, recording the
+    version at which each controllable was added or last changed and when
+    it was removed. A client that sends the version it has receives only
+    the differences since then; a client without one, from another epoch
+    (a different Blender process or file) or from before the retained
+    removal history receives a full snapshot.
+    """
+
+    MAX_REMOVED = 1024
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self.version = 0
+        # (category, name) -> (entry, version added, version last changed)
+        self._entries = {}
+        # (category, name) -> (version added, version removed), oldest first
+        self._removed = OrderedDict()
+        # Deltas are exact for clients at or after this version
+        self._history_start = 0
+
     @staticmethod
     def scan_controllable_objects():
         """
@@ -9,37 +43,170 @@ class TemplateWizard:
         Returns a dictionary of controllable objects categorized by type.
         Handles lights, cameras, materials, and objects.
         """
+        indexed = controllable_index.controllables()
         controllables = {
             'cameras': [
                 {'name': camera.name, 'supported_controls': [
                     'activate', 'settings']}
-                for camera in bpy.data.cameras if camera.name.startswith('controllable_')
+                for camera in indexed['cameras']
             ],
             'lights': [
                 {'name': light.name, 'type': light.type,
                     'supported_controls': ['color', 'strength', 'temperature']}
-                for light in bpy.data.lights if light.name.startswith('controllable_')
+                for light in indexed['lights']
             ],
             'materials': [
                 {'name': material.name, 'supported_controls': [
                     'color', 'roughness', 'metallic']}
-                for material in bpy.data.materials if material.name.startswith('controllable_')
+                for material in indexed['materials']
             ],
             'objects': [
                 {'name': obj.name, 'type': obj.type, 'supported_controls': [
                     'location', 'rotation', 'scale']}
-                for obj in bpy.data.objects if obj.name.startswith('controllable_')
+                for obj in indexed['objects']
             ]
         }
 
         return controllables
 
+    def _update(self, controllables):
+        """Fold a fresh scan into the tracked state, bumping the version on change"""
+        current = {
+            (category, entry['name']): entry
+            for category, entries in controllables.items()
+            for entry in entries
+        }
+        version = self.version + 1
+        changed = False
+
+        for key, entry in current.items():
+            known = self._entries.get(key)
+            if known is None:
+                self._entries[key] = (entry, version, version)
+                self._removed.pop(key, None)
+                changed = True
+            elif known[0] != entry:
+                self._entries[key] = (entry, known[1], version)
+                changed = True
+
+        for key in [key for key in self._entries if key not in current]:
+            self._removed[key] = (self._entries.pop(key)[1], version)
+            self._removed.move_to_end(key)
+            changed = True
+
+        while len(self._removed) > self.MAX_REMOVED:
+            _, (_, removed_at) = self._removed.popitem(last=False)
+            self._history_start = removed_at
+
+        if changed:
+            self.version = version
+
+    def rescan(self, since_version=None, epoch=None):
+        """
+        Scan and return the controllables as a full snapshot, or as the
+        added, changed and removed controllables since `since_version`
+        """
+        self._update(self.scan_controllable_objects())
+        result = {'version': self.version, 'epoch': self.epoch}
+
+        if (since_version is None or epoch != self.epoch
+                or not self._history_start <= since_version <= self.version):
+            controllables = {category: [] for category in CONTROLLABLE_CATEGORIES}
+            for (category, _), (entry, _, _) in self._entries.items():
+                controllables[category].append(entry)
+            result.update(full=True, controllables=controllables)
+            return result
+
+        added = {category: [] for category in CONTROLLABLE_CATEGORIES}
+        changed = {category: [] for category in CONTROLLABLE_CATEGORIES}
+        removed = {category: [] for category in CONTROLLABLE_CATEGORIES}
+        for (category, _), (entry, added_at, changed_at) in self._entries.items():
+            if added_at > since_version:
+                added[category].append(entry)
+            elif changed_at > since_version:
+                changed[category].append(entry)
+        for (category, name), (added_at, removed_at) in self._removed.items():
+            # Controllables added and removed since then were never seen by the client
+            if removed_at > since_version >= added_at:
+                removed[category].append(name)
+
+        result.update(full=False, added=added, changed=changed, removed=removed)
+        return result
+
+
+def _timed_render(scene, percentage):
+    """Render the current frame at a resolution percentage; returns (pixels, seconds)"""
+    render = scene.render
+    render.resolution_percentage = percentage
+    pixels = (render.resolution_x * percentage // 100) * (render.resolution_y * percentage // 100)
+    started = time.perf_counter()
+    bpy.ops.render.render(write_still=False)
+    return pixels, time.perf_counter() - started
+
+
+def estimate_frame_cost(scene, probe_percentage=25):
+    """
+    Estimated seconds to render one frame at the output resolution.
+
+    Renders the current frame at probe_percentage and half of it and fits
+    time = overhead + cost per pixel, so the fixed scene preparation cost
+    is not scaled up with the resolution.
+    """
+    render = scene.render
+    original_percentage = render.resolution_percentage
+    probe = max(2, min(probe_percentage, original_percentage))
+    try:
+        small_pixels, small_time = _timed_render(scene, probe // 2)
+        large_pixels, large_time = _timed_render(scene, probe)
+    finally:
+        render.resolution_percentage = original_percentage
+
+    full_pixels = ((render.resolution_x * original_percentage // 100)
+                   * (render.resolution_y * original_percentage // 100))
+    if large_pixels <= small_pixels:
+        return large_time
+    per_pixel = max(large_time - small_time, 0.0) / (large_pixels - small_pixels)
+    overhead = max(small_time - per_pixel * small_pixels, 0.0)
+    return overhead + per_pixel * full_pixels
+
+
+def extract_template_metadata(probe_percentage=25):
+    """Controllables and render metadata of the open template"""
+    scene = bpy.context.scene
+    render = scene.render
+    return {
+        'controllables': TemplateWizard.scan_controllable_objects(),
+        'frame_start': scene.frame_start,
+        'frame_end': scene.frame_end,
+        'fps': render.fps / render.fps_base,
+        'resolution_x': render.resolution_x * render.resolution_percentage // 100,
+        'resolution_y': render.resolution_y * render.resolution_percentage // 100,
+        'render_engine': render.engine,
+        'estimated_frame_cost': estimate_frame_cost(scene, probe_percentage),
+    }
+
+
+class IngestTemplateOperator(bpy.types.Operator):
+    """Print the controllables and render metadata of the open template"""
+    bl_idname = "template_wizard.ingest_template"
+    bl_label = "Ingest Template"
+    bl_description = "Extract the controllables and render metadata of the open template"
+
+    probe_percentage: bpy.props.IntProperty(
+        name="Probe Resolution %", default=25, min=2, max=100)
+
+    def execute(self, context):
+        metadata = extract_template_metadata(self.probe_percentage)
+        # Read back from stdout by the server, one line after the marker
+        print(f"{INGEST_MARKER} {json.dumps(metadata)}", flush=True)
+        return {'FINISHED'}
+
 
 def register():
-    """Register module (if needed)"""
-    pass
+    """Register the template ingestion operator"""
+    bpy.utils.register_class(IngestTemplateOperator)
 
 
 def unregister():
-    """Unregister module (if needed)"""
-    pass
+    """Unregister the template ingestion operator"""
+    bpy.utils.unregister_class(IngestTemplateOperator)
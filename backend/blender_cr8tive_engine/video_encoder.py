@@ -0,0 +1,121 @@
+import os
+import queue
+import logging
+import threading
+import subprocess
+from pathlib import Path
+
+
+class StreamingVideoEncoder:
+    """
+    Encodes preview frames into an MP4 while they are being rendered.
+
+    Frame files are read and piped into one persistent ffmpeg process by a
+    writer thread, and finishing waits for ffmpeg on a thread of its own, so
+    Blender's main thread never waits on the encoder. The file is written
+    under a temporary name and only moved into place once ffmpeg succeeded.
+    """
+
+    def __init__(self, output_path, fps, crf=23, preset='medium', ffmpeg=None):
+        self.output_path = Path(output_path)
+        self.temp_path = self.output_path.with_name(
+            f"{self.output_path.stem}.part{self.output_path.suffix}")
+        self.fps = fps
+        self.crf = crf
+        self.preset = preset
+        self.ffmpeg = ffmpeg or os.environ.get('CR8_FFMPEG', 'ffmpeg')
+        self.process = None
+        self.error = None
+        self.frames_written = 0
+        # Paths, not frame data, so the queue stays small behind a slow encoder
+        self._frames = queue.Queue()
+        self._writer = None
+        self._finisher = None
+
+    def _command(self):
+        return [
+            self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'image2pipe', '-c:v', 'png', '-framerate', f"{self.fps:g}", '-i', '-',
+            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
+            # The server's h264_web export preset, exports reuse this file
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+            '-profile:v', 'high', '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+            '-f', 'mp4', str(self.temp_path),
+        ]
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self._command(), stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+
+    def add_frame(self, frame_path):
+        """Queue a finished frame file for encoding; never blocks"""
+        if self.error:
+            return
+        self._frames.put_nowait(frame_path)
+
+    def _write_frames(self):
+        while True:
+            frame_path = self._frames.get()
+            if frame_path is None:
+                break
+            if self.error:
+                continue
+            try:
+                with open(frame_path, 'rb') as f:
+                    self.process.stdin.write(f.read())
+                self.frames_written += 1
+            except (BrokenPipeError, OSError) as e:
+                if not self.error:
+                    self.error = str(e)
+                    logging.error(f"Video encoder stopped accepting frames: {e}")
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def finish(self, on_done, timeout=120):
+        """
+        Flush the remaining frames and wait for the MP4 in the background;
+        on_done(path or None) is called from that thread
+        """
+        self._frames.put(None)
+        self._finisher = threading.Thread(
+            target=lambda: on_done(self._wait(timeout)), name='cr8-video-finish',
+            daemon=True)
+        self._finisher.start()
+
+    def _wait(self, timeout):
+        self._writer.join()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+            self.error = 'ffmpeg timed out'
+        stderr = self.process.stderr.read()
+
+        if self.process.returncode != 0 or self.error:
+            logging.error(
+                f"Video encoding failed: {self.error or stderr.decode(errors='replace')}")
+            self.temp_path.unlink(missing_ok=True)
+            return None
+
+        os.replace(self.temp_path, self.output_path)
+        return self.output_path
+
+    def abort(self):
+        """Stop encoding and discard the partial video"""
+        self.error = self.error or 'aborted'
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+        if self._writer:
+            self._frames.put(None)
+            self._writer.join()
+        if self.process:
+            self.process.wait()
+        if self._finisher and self._finisher is not threading.current_thread():
+            # A finish in progress must not move the video into place afterwards
+            self._finisher.join()
+        self.temp_path.unlink(missing_ok=True)
@@ -7,22 +7,42 @@ import logging
 import websocket
 from .template_wizard import TemplateWizard
 from .blender_controllers import BlenderControllers
-from .video_generator import GenerateVideo
+from .render_cache import render_cache
+from .render_job import RenderJob
+from .main_thread_executor import main_thread
+from .command_dedupe import CommandDedupeStore
+from .controllable_index import controllable_index
+from .outbound_sender import OutboundSender
 import tempfile
-from pathlib import Path
 import ssl
 import time  # Add this if not already imported
 
+try:
+    import msgpack
+except ImportError:  # Not bundled with Blender, the link stays on JSON
+    msgpack = None
+
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def execute_in_main_thread(function, args):
+def execute_in_main_thread(function, args, key=None, merge=None):
     """Execute a function in Blender's main thread"""
-    def wrapper():
-        function(*args)
-        return None
-    bpy.app.timers.register(wrapper, first_interval=0.0)
+    main_thread.submit(function, args, key=key, merge=merge)
+
+
+# Message ids of every command folded into a coalesced one
+MERGED_MESSAGE_IDS = '_merged_message_ids'
+
+
+def _merge_command_data(old_args, new_args):
+    """Fold a newer update into a pending one, keeping values it leaves unset"""
+    old_data, new_data = old_args[0], new_args[0]
+    merged = dict(old_data)
+    merged.update({key: value for key, value in new_data.items() if value is not None})
+    merged[MERGED_MESSAGE_IDS] = old_data.get(MERGED_MESSAGE_IDS, [old_data.get('message_id')]) + [
+        new_data.get('message_id')]
+    return (merged,)
 
 
 class WebSocketHandler:
@@ -35,8 +55,28 @@ class WebSocketHandler:
         'update_material': '_handle_material_update',
         'update_object': '_handle_object_transformation',
         'start_preview_rendering': '_handle_preview_rendering',
-        'generate_video': '_handle_generate_video',
-        'rescan_template': '_handle_rescan_template'
+        'cancel_render': '_handle_cancel_render',
+        'apply_scene_config': '_handle_apply_scene_config',
+        'rescan_template': '_handle_rescan_template',
+        'get_stats': '_handle_get_stats',
+        'codec_selected': '_handle_codec_selected'
+    }
+
+    # Pending updates to the same target are merged before they run,
+    # so a burst of slider changes is applied (and answered) once
+    coalesced_commands = {
+        'update_light': 'light_name',
+        'update_material': 'material_name',
+        'update_object': 'object_name',
+    }
+
+    # Large or frequent responses, sent after every pending control response
+    bulk_responses = {'template_controls', 'render_progress', 'handler_stats'}
+
+    # A pending response with the same value of this field is replaced,
+    # only the latest progress of a render is worth sending
+    merged_responses = {
+        'render_progress': 'render_id',
     }
 
     def __new__(cls):
@@ -86,16 +126,29 @@ class WebSocketHandler:
         self.wizard = TemplateWizard()
         self.controllers = BlenderControllers()
         self.processing_complete = threading.Event()
-        self.processed_commands = set()
+        self.processed_commands = CommandDedupeStore()
+        # Codec of outgoing messages, switched once the server agrees
+        self.codec = 'json'
+        # Every message to the server goes through the sender thread, one
+        # sender for the handler's lifetime, started by every connect()
+        if getattr(self, 'sender', None) is None:
+            self.sender = OutboundSender(self._write, self._encode)
+        # Preview render in progress, superseded by every new request
+        self.render_job = None
         self.reconnect_attempts = 0
         self.max_retries = 5
         self.stop_retries = False
+        main_thread.start()
+        controllable_index.start()
+        # Hash the blend file before the first preview asks for it
+        render_cache.blend_file_digest()
 
     def connect(self, retries=5, delay=2):
         """Establish WebSocket connection with retries and exponential backoff"""
         self.max_retries = retries
         self.reconnect_attempts = 0
         self.stop_retries = False
+        self.sender.start()
 
         try:
             # Create SSL context with proper security settings
@@ -173,6 +226,8 @@ class WebSocketHandler:
     def disconnect(self):
         """Disconnect WebSocket"""
         with self.lock:
+            if getattr(self, 'sender', None):
+                self.sender.stop()
             self.processing_complete.set()
             self.stop_retries = True
             if self.ws and self.ws.sock and self.ws.sock.connected:
@@ -185,18 +240,17 @@ class WebSocketHandler:
 
     def _on_open(self, ws):
         self.reconnect_attempts = 0
-
-        def send_init_message():
-            try:
-                init_message = json.dumps({
-                    'status': 'Connected',
-                })
-                ws.send(init_message)
-                logging.info("Connected Successfully")
-            except Exception as e:
-                logging.error(f"Error in _on_open: {e}")
-
-        execute_in_main_thread(send_init_message, ())
+        self.codec = 'json'
+
+        self.sender.submit({
+            'status': 'Connected',
+        })
+        if msgpack:
+            self.sender.submit({
+                'command': 'negotiate_codec',
+                'codecs': ['msgpack', 'json']
+            })
+        logging.info("Connected Successfully")
 
     def _on_message(self, ws, message):
         self.process_message(message)
@@ -204,7 +258,11 @@ class WebSocketHandler:
     def process_message(self, message):
         try:
             logging.info(f"Processing incoming message: {message}")
-            data = json.loads(message)
+            # Binary frames are MessagePack, text frames JSON
+            if isinstance(message, bytes):
+                data = msgpack.unpackb(message, raw=False)
+            else:
+                data = json.loads(message)
             command = data.get('command')
             message_id = data.get('message_id')
 
@@ -212,7 +270,7 @@ class WebSocketHandler:
                 f"Parsed message - command: {command}, message_id: {message_id}")
 
             # Prevent reprocessing of the same command
-            if (command, message_id) in self.processed_commands:
+            if message_id and self.processed_commands.seen((command, message_id)):
                 logging.warning(
                     f"Skipping already processed command: {command} with message_id: {message_id}")
                 return
@@ -232,13 +290,20 @@ class WebSocketHandler:
                 logging.info(
                     f"Found handler for command {command}: {handler_method.__name__}")
 
-                def execute_handler():
-                    handler_method(data)
-                    # Mark this command as processed
-                    self.processed_commands.add((command, message_id))
+                def execute_handler(command_data):
+                    handler_method(command_data)
+                    # Mark this command, and every one merged into it, as processed
+                    processed_ids = command_data.get(
+                        MERGED_MESSAGE_IDS, [command_data.get('message_id')])
+                    for processed_id in filter(None, processed_ids):
+                        self.processed_commands.add((command, processed_id))
                     logging.info(
-                        f"Marked command {command} with message_id {message_id} as processed")
-                execute_in_main_thread(execute_handler, ())
+                        f"Marked command {command} with message_ids {processed_ids} as processed")
+
+                target_field = self.coalesced_commands.get(command)
+                key = (command, data.get(target_field)) if target_field else None
+                execute_in_main_thread(
+                    execute_handler, (data,), key=key, merge=_merge_command_data)
             else:
                 logging.warning(f"No handler found for command: {command}")
 
@@ -280,43 +345,24 @@ class WebSocketHandler:
         params = data.get('params', {})
         preview_renderer = self.controllers.create_preview_renderer(
             self.username)
+        # The MP4 is finished in the background, after start_broadcast was sent
+        preview_renderer.on_video_ready = lambda video_path, fps: self._send_response(
+            'preview_video_ready', True, {
+                'render_id': preview_renderer.manifest.generation,
+                'video': video_path.name,
+                'fps': fps
+            })
+
+        # A newer request replaces the render in progress
+        if self.render_job and self.render_job.cancel():
+            logging.info("Superseded the running preview render")
 
         try:
-            # Process updates before rendering
-            if 'camera' in params:
-                camera_data = params['camera']
-                result = self.controllers.set_active_camera(
-                    camera_data.get('camera_name'))
-                logging.info(f"Camera update result: {result}")
-
-            if 'lights' in params:
-                light_update = params['lights']
-                result = self.controllers.update_light(
-                    light_update.get('light_name'),
-                    color=light_update.get('color'),
-                    strength=light_update.get('strength')
-                )
-                logging.info(f"Light update result: {result}")
-
-            if 'materials' in params:
-                for material_update in params['materials']:
-                    result = self.controllers.update_material(
-                        material_update.get('material_name'),
-                        color=material_update.get('color'),
-                        roughness=material_update.get('roughness'),
-                        metallic=material_update.get('metallic')
-                    )
-                    logging.info(f"Material update result: {result}")
-
-            if 'objects' in params:
-                for object_update in params['objects']:
-                    result = self.controllers.update_object(
-                        object_update.get('object_name'),
-                        location=object_update.get('location'),
-                        rotation=object_update.get('rotation'),
-                        scale=object_update.get('scale')
-                    )
-                    logging.info(f"Object update result: {result}")
+            # Process updates before rendering, invalid items are skipped
+            result = self.controllers.apply_scene_config(params, atomic=False)
+            logging.info(
+                f"Scene config: {result['applied']} applied, {result['unchanged']} unchanged, "
+                f"{result['failed']} failed")
 
             # Cleanup any existing preview frames
             preview_renderer.cleanup()
@@ -324,74 +370,94 @@ class WebSocketHandler:
             # Setup preview render settings
             preview_renderer.setup_preview_render(params)
 
-            # Render the entire animation once
-            bpy.ops.render.opengl(animation=True)
+            # Identical scene state and settings render identical frames,
+            # no key while the blend file is still being hashed
+            cache_key = render_cache.digest()
+            cached = render_cache.lookup(cache_key) if cache_key else None
 
-            self._send_response('start_broadcast', True)
-
-        except Exception as e:
-            logging.error(f"Preview rendering error: {e}")
-            import traceback
-            traceback.print_exc()
-            self._send_response('Preview Rendering failed', False)
-
-    def _handle_generate_video(self, data):
-        """Generate video based on the available frames."""
-        image_sequence_directory = Path(
-            f"/mnt/shared_storage/Cr8tive_Engine/Sessions/{self.username}") / "preview"
-        output_file = image_sequence_directory / "preview.mp4"
-        resolution = (1280, 720)
-        fps = 30
-
-        try:
-
-            # Include the message_id in your processing and response
-            message_id = data.get('message_id')
-
-            # Ensure the directory exists
-            image_sequence_directory.mkdir(parents=True, exist_ok=True)
-
-            # Check if there are actually image files in the directory
-            image_files = list(image_sequence_directory.glob('*.png'))
-            if not image_files:
-                raise ValueError(
-                    "No image files found in the specified directory")
-
-            # Initialize and execute the handler
-            video_generator = GenerateVideo(
-                str(image_sequence_directory),
-                str(output_file),
-                resolution,
-                fps
-            )
-            video_generator.gen_video_from_images()
-
-            # Send success response with message_id
-            self._send_response('generate_video', {
-                "success": True,
-                "status": "completed",
-                "message_id": message_id
+            # Let the server start streaming frames while they are rendered
+            self._send_response('preview_render_started', True, {
+                **preview_renderer.get_render_info(),
+                'cached': cached is not None
             })
 
-            # Disconnect from the client if everything is successful
-            self.disconnect()
+            rendered = False
+            if cached:
+                try:
+                    preview_renderer.render_from_cache(
+                        render_cache, cached, data.get('render_id'))
+                    rendered = True
+                    logging.info(f"Preview served from render cache {cache_key}")
+                except OSError as e:
+                    # Evicted by another instance while restoring, render it instead
+                    logging.warning(f"Cached render {cache_key} unavailable: {e}")
+
+            if not rendered:
+                # One frame per timer tick, start_broadcast follows once it completes
+                self._start_render_job(
+                    preview_renderer, cache_key, data.get('render_id'))
+                return
+
+            self._send_response(
+                'start_broadcast', True, preview_renderer.get_render_info())
 
         except Exception as e:
-            error_message = str(e)
-            logging.error(
-                f"Video generation error in directory {image_sequence_directory}: {error_message}"
-            )
+            logging.error(f"Preview rendering error: {e}")
             import traceback
             traceback.print_exc()
-
-            # Send error response with message_id
-            self._send_response('generate_video', {
-                "success": False,
-                "status": "failed",
-                "message_id": message_id
+            self._send_response('Preview Rendering failed', False, {
+                'render_id': data.get('render_id')
             })
 
-            logging.error(f"Video generation failed: {e}")
+    def _start_render_job(self, preview_renderer, cache_key, render_id):
+        def on_progress(job):
+            self._send_response('render_progress', True, job.progress())
+
+        def on_finished(job):
+            if self.render_job is job:
+                self.render_job = None
+
+            if job.status == 'completed':
+                # Scene edits between ticks would have mixed states into the frames
+                if cache_key and render_cache.digest() == cache_key:
+                    render_cache.store(
+                        cache_key, preview_renderer.preview_dir,
+                        preview_renderer.manifest.frames, preview_renderer.get_render_info())
+                elif cache_key:
+                    logging.info("Scene changed while rendering, not caching the preview")
+                self._send_response(
+                    'start_broadcast', True, preview_renderer.get_render_info())
+            elif job.status == 'cancelled':
+                self._send_response('render_cancelled', True, job.progress())
+            else:
+                self._send_response('Preview Rendering failed', False, {
+                    'render_id': job.generation
+                })
+
+        self.render_job = RenderJob(
+            preview_renderer, render_id, on_progress=on_progress, on_finished=on_finished)
+        self.render_job.start()
+
+    def _handle_cancel_render(self, data):
+        """Cancel the running preview render, optionally only if it is the given one"""
+        render_id = data.get('render_id')
+        job = self.render_job
+        if job and (not render_id or render_id == job.generation) and job.cancel():
+            logging.info(f"Cancelled preview render {job.generation}")
+            return
+
+        self._send_response('render_cancelled', False, {
+            'render_id': render_id,
+            'message': 'No matching render in progress'
+        })
+
+    def _handle_apply_scene_config(self, data):
+        """Apply a whole scene configuration and answer with one aggregated result"""
+        result = self.controllers.apply_scene_config(data.get('config') or {})
+        self._send_response('scene_config_result', result['success'], {
+            **result,
+            'message_id': data.get('message_id')
+        })
 
     def _handle_rescan_template(self, data):
         """Rescan the controllable objects and send the response"""
@@ -400,21 +466,23 @@ class WebSocketHandler:
             logging.info(
                 f"Handling template rescan request with message_id: {message_id}")
 
-            controllables = self.wizard.scan_controllable_objects()
-            logging.info(f"Scanned {len(controllables)} controllable objects")
+            # Only the differences since the version the client already has
+            scan = self.wizard.rescan(
+                since_version=data.get('since_version'), epoch=data.get('epoch'))
+            logging.info(
+                f"Scanned template at version {scan['version']} "
+                f"({'full snapshot' if scan['full'] else 'delta'})")
 
             # Format the response with message_id and data
             result = {
                 "data": {
-                    "controllables": controllables,
+                    **scan,
                     "message_id": message_id  # Include in data object
                 }
             }
             logging.info(
                 f"Sending template controls response with message_id: {message_id}")
             self._send_response('template_controls', True, result)
-            logging.info(
-                f"Successfully rescanned template with {len(controllables)} controllables")
         except Exception as e:
             logging.error(f"Error during template rescan: {e}")
             self._send_response('template_controls', False, {
@@ -422,6 +490,21 @@ class WebSocketHandler:
                 "message_id": data.get('message_id')
             })
 
+    def _handle_get_stats(self, data):
+        """Report the command dedupe and main thread queue counters"""
+        self._send_response('handler_stats', True, {
+            'dedupe': self.processed_commands.stats(),
+            'main_thread': main_thread.stats(),
+            'controllable_index': controllable_index.stats(),
+            'sender': self.sender.stats(),
+            'message_id': data.get('message_id')
+        })
+
+    def _handle_codec_selected(self, data):
+        codec = data.get('codec')
+        self.codec = codec if codec == 'msgpack' and msgpack else 'json'
+        logging.info(f"Messages to the server are encoded as {self.codec}")
+
     def _send_response(self, command, result, data=None, message_id=None):
         """
         Send a WebSocket response.
@@ -450,12 +533,24 @@ class WebSocketHandler:
             # Always keep data in its own field to maintain structure
             response['data'] = data
 
-        # Convert the response dictionary to a JSON string
-        json_response = json.dumps(response)
-        logging.info(f"Sending WebSocket response: {json_response}")
+        logging.info(f"Queueing WebSocket response: {command} ({status})")
+
+        # Encoded and sent by the sender thread, never blocks the caller
+        merge_field = self.merged_responses.get(command)
+        key = (command, data.get(merge_field)) if merge_field and isinstance(data, dict) else None
+        self.sender.submit(response, bulk=command in self.bulk_responses, key=key)
+
+    def _encode(self, message):
+        """Encode a message in the negotiated codec; returns (payload, binary)"""
+        if self.codec == 'msgpack':
+            return msgpack.packb(message, use_bin_type=True), True
+        return json.dumps(message), False
 
-        # Send the response via WebSocket
-        self.ws.send(json_response)
+    def _write(self, payload, binary):
+        ws = self.ws
+        if not ws:
+            raise ConnectionError("WebSocket is not connected")
+        ws.send(payload, opcode=websocket.ABNF.OPCODE_BINARY if binary else websocket.ABNF.OPCODE_TEXT)
 
     def _on_close(self, ws, close_status_code, close_msg):
         logging.info(
@@ -493,9 +588,13 @@ class ConnectWebSocketOperator(bpy.types.Operator):
 def register():
     """Register WebSocket handler and operator"""
     bpy.utils.register_class(ConnectWebSocketOperator)
+    main_thread.start()
+    controllable_index.start()
 
 
 def unregister():
     """Unregister WebSocket handler and operator"""
     bpy.utils.unregister_class(ConnectWebSocketOperator)
+    main_thread.stop()
+    controllable_index.stop()
     websocket_handler.disconnect()
@@ -1,9 +1,10 @@
 from typing import List, Optional, Any
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
 from app.db.session import get_db
 from supabase import Client
 from app.models.template import Template
 from app.helpers.minio_helper import upload_file_to_minio
+from app.services.template_ingestion_service import TemplateIngestionService, IngestionStatus
 import uuid
 from datetime import datetime
 
@@ -13,6 +14,7 @@ router = APIRouter()
 @router.post("/create", response_model=Template)
 async def create_template(
     template_data: dict,
+    background_tasks: BackgroundTasks,
     db: Client = Depends(get_db)
 ) -> Any:
     # Extract required fields
@@ -55,6 +57,7 @@ async def create_template(
             "creator_id": creator_id,
             "price": price,
             "is_public": is_public,
+            "ingestion_status": IngestionStatus.PENDING,
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
@@ -68,6 +71,12 @@ async def create_template(
 
         # Convert to Template model
         template = result.data[0]
+
+        # Extract controllables and render metadata once, in the background
+        background_tasks.add_task(
+            TemplateIngestionService.ingest, db, template.get("id"),
+            template_file_content, template_file.filename)
+
         template_model = Template(
             id=template.get("id"),
             name=template.get("name"),
@@ -77,7 +86,16 @@ async def create_template(
             tags=template.get("tags"),
             creator_id=template.get("creator_id"),
             price=template.get("price"),
-            is_public=template.get("is_public")
+            is_public=template.get("is_public"),
+            ingestion_status=template.get("ingestion_status"),
+            controllables=template.get("controllables"),
+            frame_start=template.get("frame_start"),
+            frame_end=template.get("frame_end"),
+            fps=template.get("fps"),
+            resolution_x=template.get("resolution_x"),
+            resolution_y=template.get("resolution_y"),
+            render_engine=template.get("render_engine"),
+            estimated_frame_cost=template.get("estimated_frame_cost")
         )
 
         return template_model
@@ -122,7 +140,16 @@ async def list_templates(
                 tags=template.get("tags"),
                 creator_id=template.get("creator_id"),
                 price=template.get("price"),
-                is_public=template.get("is_public")
+                is_public=template.get("is_public"),
+                ingestion_status=template.get("ingestion_status"),
+                controllables=template.get("controllables"),
+                frame_start=template.get("frame_start"),
+                frame_end=template.get("frame_end"),
+                fps=template.get("fps"),
+                resolution_x=template.get("resolution_x"),
+                resolution_y=template.get("resolution_y"),
+                render_engine=template.get("render_engine"),
+                estimated_frame_cost=template.get("estimated_frame_cost")
             ) for template in result.data or []
         ]
 
@@ -46,6 +46,36 @@ class Settings(BaseSettings):
     BLENDER_REMOTE_DIRECTORY: str
     BLENDER_RENDER_PREVIEW_DIRECTORY: str
 
+    # Preview streaming
+    PREVIEW_STREAM_POLL_INTERVAL: float = 0.05
+    PREVIEW_FRAME_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PREVIEW_TRANSCODE_WORKERS: int = 4
+    PREVIEW_FRAME_QUALITY: int = 80
+    PREVIEW_DELTA_KEYFRAME_INTERVAL: int = 30
+    PREVIEW_DELTA_TILE_SIZE: int = 32
+    PREVIEW_VIEWER_QUEUE_SIZE: int = 8
+    PREVIEW_FFMPEG_BINARY: str = "ffmpeg"
+    PREVIEW_FFMPEG_MAX_PROCESSES: int = 4
+    PREVIEW_FMP4_CRF: int = 28
+    PREVIEW_FMP4_PRESET: str = "veryfast"
+    PREVIEW_SPRITE_THUMB_WIDTH: int = 160
+    PREVIEW_SPRITE_COLUMNS: int = 10
+    PREVIEW_SPRITE_MAX_FRAMES: int = 300
+    PREVIEW_SPRITE_FORMAT: str = "jpeg"
+    PREVIEW_RENDER_DEBOUNCE: float = 0.3
+
+    # Video export, defaults to an exports folder next to the preview sessions
+    VIDEO_EXPORT_DIRECTORY: Optional[str] = None
+    VIDEO_EXPORT_WORKERS: int = 2
+    # ffmpeg processes one export is split across, 0 for one per CPU core
+    VIDEO_EXPORT_SEGMENT_WORKERS: int = 0
+    VIDEO_EXPORT_MIN_SEGMENT_FRAMES: int = 48
+
+    # Template ingestion, runs a headless Blender on the SSH host
+    TEMPLATE_INGEST_MAX_JOBS: int = 1
+    TEMPLATE_INGEST_TIMEOUT: float = 600
+    TEMPLATE_INGEST_PROBE_PERCENTAGE: int = 25
+
     DEV_ENV: bool = False
 
     @property
@@ -1,4 +1,5 @@
 from typing import Optional, Dict, Any, List
+from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
 from .user import User
 
@@ -16,6 +17,19 @@ class Template(SQLModel, table=True):
     price: Optional[float] = None
     is_public: bool = Field(default=False)
 
+    # Extracted from the blend file by the ingestion job
+    ingestion_status: Optional[str] = None
+    controllables: Optional[Dict[str, Any]] = Field(
+        default=None, sa_column=Column(JSON))
+    frame_start: Optional[int] = None
+    frame_end: Optional[int] = None
+    fps: Optional[float] = None
+    resolution_x: Optional[int] = None
+    resolution_y: Optional[int] = None
+    render_engine: Optional[str] = None
+    estimated_frame_cost: Optional[float] = None  # Seconds per frame
+    ingested_at: Optional[datetime] = None
+
     # Relationships
     project_templates: List["ProjectTemplate"] = Relationship(
         back_populates="template")
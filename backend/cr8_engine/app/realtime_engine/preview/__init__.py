@@ -0,0 +1,16 @@
+"""
+Preview Streaming Package
+
+Frame transport, caching and encoding used when broadcasting
+Blender preview renders to browser clients.
+"""
+
+from .frame_protocol import FrameCodec, FrameFlags, FrameTransport, encode_frame_header, decode_frame_header
+
+__all__ = [
+    'FrameCodec',
+    'FrameFlags',
+    'FrameTransport',
+    'encode_frame_header',
+    'decode_frame_header',
+]
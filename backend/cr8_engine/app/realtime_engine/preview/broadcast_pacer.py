@@ -0,0 +1,125 @@
+# app/realtime_engine/preview/broadcast_pacer.py
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class BroadcastPacer:
+    """
+    Schedules frame sends against absolute deadlines derived from the scene fps.
+
+    Frame ``n`` of a broadcast is due at ``start + n / fps`` regardless of how
+    long reading or sending the previous frames took, so send time does not
+    accumulate into drift. When the browser negotiated an ack window, every
+    sent frame consumes one credit and every ``frame_ack`` returns one. A frame
+    is held back while no credit is available and dropped once it is more than
+    one frame interval late.
+    """
+
+    def __init__(self, fps: float = 30.0, credit_window: Optional[int] = None):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.frame_interval = 1.0 / self.fps
+        self.credit_window = credit_window if credit_window and credit_window > 0 else None
+        self.credits = self.credit_window or 0
+        self._credit_available = asyncio.Event()
+        if self.credit_window:
+            self._credit_available.set()
+
+        self._start: Optional[float] = None
+        self._first_send: Optional[float] = None
+        self._last_send: Optional[float] = None
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_acked = 0
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    def start(self) -> None:
+        """Anchor the deadline schedule at the current time"""
+        self._start = self._now()
+
+    def deadline(self, slot: int) -> float:
+        """Absolute loop time at which the given broadcast slot is due"""
+        if self._start is None:
+            self.start()
+        return self._start + slot * self.frame_interval
+
+    async def wait_for_credit(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the client has room for another frame"""
+        if not self.credit_window:
+            return True
+
+        if self.credits <= 0:
+            self._credit_available.clear()
+            try:
+                await asyncio.wait_for(self._credit_available.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return self.credits > 0
+
+    async def wait_for_slot(self, slot: int) -> bool:
+        """
+        Wait until the slot is due and the client has credit.
+        Returns False (and counts a drop) when the frame should be skipped.
+        """
+        deadline = self.deadline(slot)
+        late_limit = deadline + self.frame_interval
+
+        if self._now() > late_limit:
+            self.frames_dropped += 1
+            return False
+
+        if not await self.wait_for_credit(max(late_limit - self._now(), 0)):
+            self.frames_dropped += 1
+            return False
+
+        delay = deadline - self._now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return True
+
+    async def wait_until_due(self, slot: int) -> None:
+        """Wait for the slot's deadline without dropping; for encoded streams every frame counts"""
+        delay = self.deadline(slot) - self._now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_drop(self) -> None:
+        self.frames_dropped += 1
+
+    def record_sent(self) -> None:
+        now = self._now()
+        if self._first_send is None:
+            self._first_send = now
+        self._last_send = now
+        self.frames_sent += 1
+
+        if self.credit_window:
+            self.credits -= 1
+            if self.credits <= 0:
+                self._credit_available.clear()
+
+    def acknowledge(self) -> None:
+        """Return one credit after the browser acknowledged a frame"""
+        self.frames_acked += 1
+        if self.credit_window:
+            self.credits = min(self.credits + 1, self.credit_window)
+            self._credit_available.set()
+
+    @property
+    def achieved_fps(self) -> float:
+        if self.frames_sent < 2 or self._first_send is None:
+            return 0.0
+        elapsed = self._last_send - self._first_send
+        return (self.frames_sent - 1) / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "target_fps": round(self.fps, 3),
+            "achieved_fps": round(self.achieved_fps, 3),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_acked": self.frames_acked,
+            "credit_window": self.credit_window,
+        }
@@ -0,0 +1,141 @@
+# app/realtime_engine/preview/delta_codec.py
+import io
+import struct
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from .frame_protocol import FrameCodec
+
+
+class DeltaKind:
+    KEYFRAME = "keyframe"
+    DELTA = "delta"
+    REPEAT = "repeat"
+
+
+# Binary delta payload: rect count, then per rect x, y, width, height,
+# encoded length followed by the encoded tile bytes
+DELTA_COUNT = struct.Struct("!H")
+DELTA_RECT = struct.Struct("!HHHHI")
+
+TILE_FORMATS = {
+    FrameCodec.PNG: "PNG",
+    FrameCodec.WEBP: "WEBP",
+    FrameCodec.JPEG: "JPEG",
+}
+
+
+class DeltaFrame:
+    """Result of encoding one frame against the last frame the client received"""
+
+    def __init__(self, kind: str, image: np.ndarray,
+                 rects: Optional[List[Tuple[int, int, int, int, bytes]]] = None):
+        self.kind = kind
+        self.image = image
+        self.rects = rects or []
+
+    def pack_rects(self) -> bytes:
+        """Serialize the changed rectangles for the binary transport"""
+        parts = [DELTA_COUNT.pack(len(self.rects))]
+        for x, y, width, height, data in self.rects:
+            parts.append(DELTA_RECT.pack(x, y, width, height, len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+
+class DeltaEncoder:
+    """
+    Encodes preview frames as changed-tile rectangles against the previous
+    frame the client received.
+
+    A full keyframe is sent every ``keyframe_interval`` frames, when the
+    resolution changes or when too much of the picture changed for tiles to
+    pay off. Identical frames collapse to a repeat marker. ``encode`` does not
+    advance the reference frame; call ``commit`` once the frame was actually
+    sent so skipped frames never desynchronise the client.
+    """
+
+    def __init__(self, keyframe_interval: int = 30, tile_size: int = 32,
+                 quality: int = 80, max_changed_ratio: float = 0.5):
+        self.keyframe_interval = max(keyframe_interval, 1)
+        self.tile_size = max(tile_size, 8)
+        self.quality = quality
+        self.max_changed_ratio = max_changed_ratio
+        self._reference: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+
+    def reset(self) -> None:
+        """Force the next frame to be a keyframe"""
+        self._reference = None
+
+    def encode(self, payload: bytes, codec: int) -> DeltaFrame:
+        """Encode a frame. CPU bound, run it off the event loop."""
+        with Image.open(io.BytesIO(payload)) as decoded:
+            image = np.asarray(decoded.convert("RGBA"))
+
+        reference = self._reference
+        if (reference is None or reference.shape != image.shape
+                or self._since_keyframe + 1 >= self.keyframe_interval):
+            return DeltaFrame(DeltaKind.KEYFRAME, image)
+
+        changed_tiles = self._changed_tiles(reference, image)
+        if not changed_tiles.any():
+            return DeltaFrame(DeltaKind.REPEAT, image)
+        if changed_tiles.mean() > self.max_changed_ratio:
+            return DeltaFrame(DeltaKind.KEYFRAME, image)
+
+        rects = [
+            (x, y, width, height, self._encode_tile(image[y:y + height, x:x + width], codec))
+            for x, y, width, height in self._tile_rects(changed_tiles, image.shape)
+        ]
+        return DeltaFrame(DeltaKind.DELTA, image, rects)
+
+    def commit(self, frame: DeltaFrame) -> None:
+        """Make a sent frame the reference for the next delta"""
+        self._reference = frame.image
+        if frame.kind == DeltaKind.KEYFRAME:
+            self._since_keyframe = 0
+        else:
+            self._since_keyframe += 1
+
+    def _changed_tiles(self, reference: np.ndarray, image: np.ndarray) -> np.ndarray:
+        """Boolean grid with one cell per tile, True where any pixel differs"""
+        changed = np.any(reference != image, axis=2)
+        size = self.tile_size
+        rows = -(-changed.shape[0] // size)
+        cols = -(-changed.shape[1] // size)
+        padded = np.zeros((rows * size, cols * size), dtype=bool)
+        padded[:changed.shape[0], :changed.shape[1]] = changed
+        return padded.reshape(rows, size, cols, size).any(axis=(1, 3))
+
+    def _tile_rects(self, changed_tiles: np.ndarray, shape) -> List[Tuple[int, int, int, int]]:
+        """Merge runs of changed tiles in each tile row into rectangles"""
+        size = self.tile_size
+        height, width = shape[0], shape[1]
+        rects = []
+        for row in range(changed_tiles.shape[0]):
+            columns = np.flatnonzero(changed_tiles[row])
+            if columns.size == 0:
+                continue
+            # Split the changed columns into contiguous runs
+            breaks = np.flatnonzero(np.diff(columns) > 1) + 1
+            for run in np.split(columns, breaks):
+                x = int(run[0]) * size
+                y = row * size
+                rect_width = min((int(run[-1]) + 1) * size, width) - x
+                rect_height = min(y + size, height) - y
+                rects.append((x, y, rect_width, rect_height))
+        return rects
+
+    def _encode_tile(self, pixels: np.ndarray, codec: int) -> bytes:
+        image_format = TILE_FORMATS.get(codec, "PNG")
+        tile = Image.fromarray(pixels, "RGBA")
+        if image_format == "JPEG":
+            tile = tile.convert("RGB")
+
+        buffer = io.BytesIO()
+        if image_format == "PNG":
+            tile.save(buffer, format=image_format)
+        else:
+            tile.save(buffer, format=image_format, quality=self.quality)
+        return buffer.getvalue()
@@ -0,0 +1,188 @@
+# app/realtime_engine/preview/fmp4_stream.py
+import asyncio
+import base64
+import json
+import logging
+import struct
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple, Union
+from app.core.config import settings
+from .frame_protocol import FrameCodec, FrameFlags, FrameTransport, build_binary_frame
+
+# H.264 constrained baseline, level 4.0; what the browser needs for MediaSource.isTypeSupported
+FMP4_MIME_TYPE = 'video/mp4; codecs="avc1.42E028"'
+
+BOX_HEADER = struct.Struct("!I4s")
+BOX_LARGE_SIZE = struct.Struct("!Q")
+
+
+class VideoSegmentPacket:
+    """
+    An fMP4 init or media segment shared by every viewer.
+
+    Unlike frames, segments are never dropped from a viewer's queue because
+    every media segment is needed to keep the MSE timeline decodable.
+    """
+
+    def __init__(self, sequence: int, data: bytes, is_init: bool = False):
+        self.sequence = sequence
+        self.data = data
+        self.is_init = is_init
+        self._messages = {}
+
+    def message(self, transport: str) -> Union[bytes, str]:
+        if transport not in self._messages:
+            if transport == FrameTransport.BINARY:
+                flags = FrameFlags.INIT_SEGMENT if self.is_init else 0
+                self._messages[transport] = build_binary_frame(
+                    self.data, self.sequence, 0, FrameCodec.FMP4, flags)
+            else:
+                self._messages[transport] = json.dumps({
+                    "type": "video_segment",
+                    "init": self.is_init,
+                    "sequence": self.sequence,
+                    "mime_type": FMP4_MIME_TYPE,
+                    "data": base64.b64encode(self.data).decode(),
+                })
+        return self._messages[transport]
+
+
+class FragmentedMP4Encoder:
+    """
+    A local ffmpeg process turning piped PNG frames into fragmented MP4.
+
+    Every keyframe starts a new fragment, so each moof/mdat pair is a
+    self-contained media segment a viewer can start decoding from.
+    """
+
+    def __init__(self, fps: float, crf: int, preset: str, binary: str = "ffmpeg"):
+        self.logger = logging.getLogger(__name__)
+        self.fps = fps
+        self.crf = crf
+        self.preset = preset
+        self.binary = binary
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.aborted = False
+
+    def _command(self):
+        fps = f"{self.fps:g}"
+        return [
+            self.binary, "-hide_banner", "-loglevel", "error",
+            "-f", "image2pipe", "-c:v", "png", "-framerate", fps, "-i", "pipe:0",
+            # yuv420p needs even dimensions
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+            "-c:v", "libx264", "-preset", self.preset, "-tune", "zerolatency",
+            "-profile:v", "baseline", "-level", "4.0", "-pix_fmt", "yuv420p",
+            "-crf", str(self.crf), "-g", str(max(int(round(self.fps)), 1)),
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-f", "mp4", "pipe:1",
+        ]
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            *self._command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def write_frame(self, payload: bytes) -> None:
+        """Pipe one PNG frame into the encoder, waiting while its input buffer is full"""
+        self.process.stdin.write(payload)
+        await self.process.stdin.drain()
+
+    async def finish(self) -> None:
+        """Signal the end of the frame sequence so ffmpeg flushes the last fragment"""
+        if self.process and self.process.stdin and not self.process.stdin.is_closing():
+            self.process.stdin.close()
+
+    async def _read_box(self) -> Optional[Tuple[bytes, bytes]]:
+        stdout = self.process.stdout
+        try:
+            header = await stdout.readexactly(BOX_HEADER.size)
+        except asyncio.IncompleteReadError:
+            return None
+
+        size, box_type = BOX_HEADER.unpack(header)
+        if size == 1:
+            large = await stdout.readexactly(BOX_LARGE_SIZE.size)
+            header += large
+            size = BOX_LARGE_SIZE.unpack(large)[0]
+        body = await stdout.readexactly(size - len(header))
+        return box_type, header + body
+
+    async def segments(self) -> AsyncIterator[VideoSegmentPacket]:
+        """
+        Yield the init segment (ftyp + moov) and then one media segment per
+        fragment (moof + mdat and any boxes in between).
+        """
+        sequence = 0
+        pending = b""
+        while True:
+            box = await self._read_box()
+            if box is None:
+                break
+            box_type, data = box
+            pending += data
+
+            if box_type == b"moov":
+                yield VideoSegmentPacket(sequence, pending, is_init=True)
+                sequence += 1
+                pending = b""
+            elif box_type == b"mdat":
+                yield VideoSegmentPacket(sequence, pending)
+                sequence += 1
+                pending = b""
+
+    def abort(self) -> None:
+        """Stop encoding right away, discarding anything not yet written"""
+        self.aborted = True
+        if self.process and self.process.returncode is None:
+            self.process.kill()
+
+    async def close(self) -> None:
+        if not self.process:
+            return
+        await self.finish()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+        if self.process.returncode not in (0, None) and not self.aborted:
+            error = await self.process.stderr.read()
+            self.logger.error(
+                f"ffmpeg exited with {self.process.returncode}: {error.decode(errors='replace')}")
+
+
+class FFmpegProcessPool:
+    """Caps how many ffmpeg encoders this server runs at once"""
+
+    def __init__(self, max_processes: int, binary: str = "ffmpeg"):
+        self.max_processes = max(max_processes, 1)
+        self.binary = binary
+        self._slots = asyncio.Semaphore(self.max_processes)
+        self.active = 0
+
+    @asynccontextmanager
+    async def encoder(self, fps: float) -> AsyncIterator[FragmentedMP4Encoder]:
+        """Wait for a free slot, then run an encoder for the duration of the block"""
+        async with self._slots:
+            encoder = FragmentedMP4Encoder(
+                fps, settings.PREVIEW_FMP4_CRF, settings.PREVIEW_FMP4_PRESET, self.binary)
+            await encoder.start()
+            self.active += 1
+            try:
+                yield encoder
+            except BaseException:
+                encoder.abort()
+                raise
+            finally:
+                self.active -= 1
+                await encoder.close()
+
+
+# Shared by every session on this server
+ffmpeg_pool = FFmpegProcessPool(
+    settings.PREVIEW_FFMPEG_MAX_PROCESSES, settings.PREVIEW_FFMPEG_BINARY)
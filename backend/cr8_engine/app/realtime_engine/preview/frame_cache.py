@@ -0,0 +1,79 @@
+# app/realtime_engine/preview/frame_cache.py
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class FrameCache:
+    """
+    Server-wide in-memory cache of encoded preview frames.
+
+    Frames are keyed by (username, render generation, frame index, variant)
+    so a new render never serves stale frames and each encoding (format and
+    quality) is cached separately. A single byte budget is shared by all
+    sessions and enforced with least-recently-used eviction.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.logger = logging.getLogger(__name__)
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._frames: "OrderedDict[Tuple[str, int, int, str], bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, username: str, generation: int, frame_index: int,
+            variant: str = "png") -> Optional[bytes]:
+        """Return a cached frame and mark it as recently used"""
+        key = (username, generation, frame_index, variant)
+        payload = self._frames.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self._frames.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, username: str, generation: int, frame_index: int, payload: bytes,
+            variant: str = "png") -> None:
+        """Cache a frame, evicting the least recently used frames to stay in budget"""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        key = (username, generation, frame_index, variant)
+        previous = self._frames.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= len(previous)
+
+        self._frames[key] = payload
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self._frames:
+            _, evicted = self._frames.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, username: str) -> None:
+        """Drop every cached frame belonging to a session"""
+        for key in [key for key in self._frames if key[0] == username]:
+            self.current_bytes -= len(self._frames.pop(key))
+
+        self.logger.debug(f"Invalidated cached frames for {username}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames": len(self._frames),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by every session on this server
+frame_cache = FrameCache(settings.PREVIEW_FRAME_CACHE_MAX_BYTES)
@@ -0,0 +1,66 @@
+# app/realtime_engine/preview/frame_index.py
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+
+class FrameIndex:
+    """
+    Ordered frame files of one render generation.
+
+    Built once per render, either while streaming or with a single directory
+    scan after the render finished, and then reused by every broadcast,
+    seek and loop of that render.
+    """
+
+    def __init__(self, generation: int, frames: Optional[Iterable[Path]] = None,
+                 complete: bool = False):
+        self.generation = generation
+        self.frames: List[Path] = list(frames or [])
+        # False while Blender may still add frames
+        self.complete = complete
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, index: int) -> Path:
+        return self.frames[index]
+
+    def append(self, frame: Path) -> int:
+        """Add the next frame and return its index"""
+        self.frames.append(frame)
+        return len(self.frames) - 1
+
+
+class PlaybackRange:
+    """Which part of a render to broadcast, how fast, and whether to loop"""
+
+    def __init__(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None,
+                 step: int = 1, fps: Optional[float] = None, loop: bool = False,
+                 seek: bool = False):
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.step = max(int(step or 1), 1)
+        self.fps = fps
+        self.loop = loop
+        # True when the update asked to jump to start_frame
+        self.seek = seek
+
+    @classmethod
+    def from_message(cls, data: dict, current: "PlaybackRange") -> "PlaybackRange":
+        """Build a range from start_broadcast fields, keeping unspecified ones"""
+        fps = data.get("fps", current.fps)
+        return cls(
+            start_frame=data.get("start_frame", current.start_frame),
+            end_frame=data.get("end_frame", current.end_frame),
+            step=data.get("step", current.step),
+            fps=float(fps) if fps else None,
+            loop=bool(data.get("loop", current.loop)),
+            seek="start_frame" in data,
+        )
+
+    def bounds(self, total_frames: int):
+        """Clamp the range to the frames available, returns (first, last) indices"""
+        last = total_frames - 1
+        first = min(max(self.start_frame or 0, 0), max(last, 0))
+        end = last if self.end_frame is None else min(max(self.end_frame, first), last)
+        return first, end
@@ -0,0 +1,113 @@
+# app/realtime_engine/preview/frame_manifest.py
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_FILE_NAME = "manifest.jsonl"
+
+
+class ManifestEntry:
+    """One completely written frame, as recorded by the Blender addon"""
+
+    def __init__(self, record: Dict[str, Any], preview_dir: Path):
+        self.frame = record.get("frame")
+        self.index = record.get("index")
+        self.file = record["file"]
+        self.size = record.get("size")
+        self.sha1 = record.get("sha1")
+        self.render_ms = record.get("render_ms")
+        self.path = preview_dir / self.file
+
+
+class FrameManifestReader:
+    """
+    Incremental reader for the append-only frame manifest the addon writes
+    next to the preview frames.
+
+    Only complete lines are parsed, and only records of the expected render
+    generation are kept, so a half-written line or a manifest left over from
+    the previous render is never mistaken for a finished frame.
+    """
+
+    def __init__(self, preview_dir: Path, generation: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.preview_dir = preview_dir
+        self.path = preview_dir / MANIFEST_FILE_NAME
+        # None accepts whatever render the manifest currently describes
+        self.generation = generation
+        self.render_info: Dict[str, Any] = {}
+        self.entries: List[ManifestEntry] = []
+        self.finished = False
+        self.status: Optional[str] = None
+        self._offset = 0
+        self._pending = b""
+        self._file_id = None
+
+    def poll(self) -> List[ManifestEntry]:
+        """Read records appended since the last poll. Blocking, run it off the event loop."""
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                file_id = (stat.st_dev, stat.st_ino)
+                if file_id != self._file_id or stat.st_size < self._offset:
+                    # Replaced by a newer render
+                    self._reset()
+                    self._file_id = file_id
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+
+        self._offset += len(chunk)
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()  # incomplete last line, if any
+
+        new_entries = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                self.logger.warning(f"Skipping malformed manifest line in {self.path}")
+                continue
+
+            entry = self._apply(record)
+            if entry is not None:
+                new_entries.append(entry)
+
+        return new_entries
+
+    def _apply(self, record: Dict[str, Any]) -> Optional[ManifestEntry]:
+        kind = record.get("type")
+        generation = record.get("generation")
+
+        if kind == "begin":
+            if self.generation is None or generation == self.generation:
+                self.generation = generation
+                self.render_info = record
+                self.entries = []
+                self.finished = False
+            return None
+
+        if generation != self.generation:
+            return None
+
+        if kind == "frame":
+            entry = ManifestEntry(record, self.preview_dir)
+            self.entries.append(entry)
+            return entry
+
+        if kind == "end":
+            self.finished = True
+            self.status = record.get("status")
+        return None
+
+    def _reset(self) -> None:
+        self._offset = 0
+        self._pending = b""
+        self.entries = []
+        self.finished = False
+        self.status = None
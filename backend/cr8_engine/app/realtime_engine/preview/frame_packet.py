@@ -0,0 +1,70 @@
+# app/realtime_engine/preview/frame_packet.py
+import json
+from typing import Dict, Optional, Tuple, Union
+from .delta_codec import DeltaFrame, DeltaKind
+from .frame_protocol import (
+    FrameFlags,
+    FrameTransport,
+    build_binary_frame,
+    build_json_frame,
+    build_json_delta_frame,
+    build_json_repeat_frame,
+)
+
+
+class FramePacket:
+    """
+    One broadcast frame, read and encoded once and shared by every viewer.
+
+    Wire messages are built lazily per transport and frame kind and memoized,
+    so five JSON viewers cost one base64 encode rather than five.
+    """
+
+    def __init__(self, frame_index: int, total_frames: int, codec: int, payload: bytes,
+                 delta: Optional[DeltaFrame] = None):
+        self.frame_index = frame_index
+        self.total_frames = total_frames
+        self.codec = codec
+        self.payload = payload
+        self.delta = delta
+        self._messages: Dict[Tuple[str, Optional[str]], Union[bytes, str]] = {}
+
+    def message(self, transport: str, use_delta: bool = True) -> Union[bytes, str]:
+        """
+        Return the wire message for a viewer. Viewers that missed the previous
+        frame pass use_delta=False and receive the full frame as a keyframe.
+        """
+        if self.delta is None:
+            kind = None
+        elif use_delta:
+            kind = self.delta.kind
+        else:
+            kind = DeltaKind.KEYFRAME
+
+        key = (transport, kind)
+        if key not in self._messages:
+            self._messages[key] = self._build(transport, kind)
+        return self._messages[key]
+
+    def _build(self, transport: str, kind: Optional[str]) -> Union[bytes, str]:
+        binary = transport == FrameTransport.BINARY
+        args = (self.frame_index, self.total_frames)
+
+        if kind == DeltaKind.REPEAT:
+            if binary:
+                return build_binary_frame(b"", *args, self.codec, FrameFlags.REPEAT)
+            return json.dumps(build_json_repeat_frame(*args))
+
+        if kind == DeltaKind.DELTA:
+            if binary:
+                return build_binary_frame(
+                    self.delta.pack_rects(), *args, self.codec, FrameFlags.DELTA)
+            return json.dumps(build_json_delta_frame(self.delta.rects, *args, self.codec))
+
+        flags = FrameFlags.KEYFRAME if kind == DeltaKind.KEYFRAME else 0
+        if binary:
+            return build_binary_frame(self.payload, *args, self.codec, flags)
+        message = build_json_frame(self.payload, *args, self.codec)
+        if kind == DeltaKind.KEYFRAME:
+            message["keyframe"] = True
+        return json.dumps(message)
@@ -0,0 +1,129 @@
+# app/realtime_engine/preview/frame_protocol.py
+import struct
+import time
+import base64
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class FrameTransport:
+    JSON = "json"      # base64 payload inside a JSON text message (default)
+    BINARY = "binary"  # fixed header followed by raw payload bytes
+
+
+class FrameCodec:
+    PNG = 1
+    WEBP = 2
+    JPEG = 3
+    FMP4 = 4  # fragmented MP4 segment for Media Source Extensions
+
+    MIME_TYPES = {
+        PNG: "image/png",
+        WEBP: "image/webp",
+        JPEG: "image/jpeg",
+        FMP4: "video/mp4",
+    }
+
+    @classmethod
+    def mime_type(cls, codec: int) -> str:
+        return cls.MIME_TYPES.get(codec, "application/octet-stream")
+
+
+class FrameFlags:
+    KEYFRAME = 0x1  # full frame that resets the client's delta reference
+    DELTA = 0x2     # payload is a list of changed rectangles
+    REPEAT = 0x4    # identical to the previous frame, empty payload
+    INIT_SEGMENT = 0x8  # fMP4 init segment (ftyp + moov), sent before any media segment
+    SPRITE_SHEET = 0x10  # scrub bar thumbnails of the whole render in one image
+
+
+# Header layout (network byte order, 24 bytes):
+#   magic        4s  b"CR8F"
+#   version      B
+#   codec        B   FrameCodec value
+#   flags        H   FrameFlags bits
+#   frame_index  I
+#   total_frames I   0 when the total is not known yet
+#   timestamp    d   seconds since the epoch when the frame was sent
+FRAME_MAGIC = b"CR8F"
+FRAME_PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("!4sBBHIId")
+
+
+def encode_frame_header(frame_index: int, total_frames: int, codec: int,
+                        timestamp: Optional[float] = None, flags: int = 0) -> bytes:
+    """Pack the fixed-size header that precedes every binary frame message"""
+    return FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        FRAME_PROTOCOL_VERSION,
+        codec,
+        flags,
+        frame_index,
+        max(total_frames, 0),
+        time.time() if timestamp is None else timestamp
+    )
+
+
+def decode_frame_header(message: bytes) -> Tuple[Dict[str, Any], memoryview]:
+    """Split a binary frame message into its header fields and payload"""
+    if len(message) < FRAME_HEADER.size:
+        raise ValueError("Binary frame message is shorter than its header")
+
+    magic, version, codec, flags, frame_index, total_frames, timestamp = FRAME_HEADER.unpack_from(
+        message)
+    if magic != FRAME_MAGIC:
+        raise ValueError(f"Unexpected frame magic: {magic!r}")
+    if version != FRAME_PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame protocol version: {version}")
+
+    header = {
+        "codec": codec,
+        "flags": flags,
+        "frame_index": frame_index,
+        "total_frames": total_frames,
+        "timestamp": timestamp,
+    }
+    return header, memoryview(message)[FRAME_HEADER.size:]
+
+
+def build_binary_frame(payload: bytes, frame_index: int, total_frames: int, codec: int,
+                       flags: int = 0) -> bytes:
+    """Build a complete binary frame message (header + payload)"""
+    return encode_frame_header(frame_index, total_frames, codec, flags=flags) + payload
+
+
+def build_json_frame(payload: bytes, frame_index: int, total_frames: int, codec: int) -> Dict[str, Any]:
+    """Build the legacy JSON frame message with a base64 payload"""
+    return {
+        "type": "frame",
+        "data": base64.b64encode(payload).decode(),
+        "frame_index": frame_index,
+        "total_frames": total_frames,
+        "mime_type": FrameCodec.mime_type(codec),
+    }
+
+
+def build_json_delta_frame(rects: List[Tuple[int, int, int, int, bytes]], frame_index: int,
+                           total_frames: int, codec: int) -> Dict[str, Any]:
+    """Build a JSON frame message carrying only the changed rectangles"""
+    return {
+        "type": "frame",
+        "delta": True,
+        "rects": [
+            {"x": x, "y": y, "width": width, "height": height,
+             "data": base64.b64encode(data).decode()}
+            for x, y, width, height, data in rects
+        ],
+        "frame_index": frame_index,
+        "total_frames": total_frames,
+        "mime_type": FrameCodec.mime_type(codec),
+    }
+
+
+def build_json_repeat_frame(frame_index: int, total_frames: int) -> Dict[str, Any]:
+    """Build a JSON frame message telling the client to keep the previous image"""
+    return {
+        "type": "frame",
+        "repeat": True,
+        "frame_index": frame_index,
+        "total_frames": total_frames,
+    }
@@ -0,0 +1,118 @@
+# app/realtime_engine/preview/frame_transcoder.py
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+from app.core.config import settings
+from .frame_protocol import FrameCodec
+
+
+class FrameFormat:
+    PNG = "png"
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+    CODECS = {
+        PNG: FrameCodec.PNG,
+        WEBP: FrameCodec.WEBP,
+        JPEG: FrameCodec.JPEG,
+    }
+
+    @classmethod
+    def normalize(cls, value: Optional[str]) -> str:
+        value = (value or cls.PNG).lower()
+        if value == "jpg":
+            value = cls.JPEG
+        if value not in cls.CODECS:
+            raise ValueError(f"Unsupported frame format: {value}")
+        return value
+
+
+def encoded_frame_path(source: Path, fmt: str, quality: int) -> Path:
+    """Location of the transcoded copy that is cached next to the source frame"""
+    return source.with_name(f"{source.stem}.q{quality}.{fmt}")
+
+
+def _transcode_file(source: str, target: str, fmt: str, quality: int) -> bytes:
+    """Encode one frame. Runs inside a worker process."""
+    from PIL import Image
+
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(source):
+            with open(target, "rb") as f:
+                return f.read()
+    except OSError:
+        pass
+
+    with Image.open(source) as image:
+        if fmt == FrameFormat.JPEG and image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        save_args = {"quality": quality}
+        if fmt == FrameFormat.WEBP:
+            save_args["method"] = 4
+        image.save(buffer, format=fmt.upper(), **save_args)
+
+    payload = buffer.getvalue()
+
+    # Write atomically so concurrent readers never see a partial file
+    temp_target = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(temp_target, "wb") as f:
+            f.write(payload)
+        os.replace(temp_target, target)
+    except OSError:
+        # The cache file is an optimisation only
+        if os.path.exists(temp_target):
+            os.unlink(temp_target)
+
+    return payload
+
+
+class FrameTranscoder:
+    """
+    Converts rendered PNG frames to a lossy format on a process pool so the
+    event loop never spends time encoding images.
+    """
+
+    def __init__(self, max_workers: int):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forked workers would inherit the pipes of running ffmpeg encoders and
+            # keep them from ever seeing the end of their input
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def transcode(self, source: Path, fmt: str, quality: int) -> Tuple[bytes, int]:
+        """Return the encoded frame bytes and their FrameCodec"""
+        if fmt == FrameFormat.PNG:
+            return await asyncio.to_thread(source.read_bytes), FrameCodec.PNG
+
+        target = encoded_frame_path(source, fmt, quality)
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(
+            self._get_executor(), _transcode_file, str(source), str(target), fmt, quality)
+        return payload, FrameFormat.CODECS[fmt]
+
+    async def run(self, fn, *args):
+        """Run another picklable image job on the same worker processes"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared by every session on this server
+frame_transcoder = FrameTranscoder(settings.PREVIEW_TRANSCODE_WORKERS)
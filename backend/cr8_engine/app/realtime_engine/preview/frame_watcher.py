@@ -0,0 +1,46 @@
+# app/realtime_engine/preview/frame_watcher.py
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+from .frame_manifest import FrameManifestReader, ManifestEntry
+
+
+class FrameWatcher:
+    """
+    Follows the frame manifest of a session while Blender is rendering and
+    yields each frame as soon as the addon has recorded it as complete.
+
+    The manifest lives on a network mount where inotify events are not
+    delivered reliably, so it is tailed off the event loop instead.
+    """
+
+    def __init__(self, preview_dir: Path, generation: Optional[str] = None,
+                 poll_interval: float = 0.05):
+        self.logger = logging.getLogger(__name__)
+        self.reader = FrameManifestReader(preview_dir, generation)
+        self.poll_interval = poll_interval
+
+    async def watch(self, is_finished: Callable[[], bool],
+                    expected_frames: Optional[int] = None) -> AsyncIterator[ManifestEntry]:
+        """
+        Yield frames until the manifest's end record, the expected number of
+        frames, or until the render reports completion and nothing new arrives.
+        """
+        seen = 0
+        while True:
+            finished = is_finished()
+            ready = await asyncio.to_thread(self.reader.poll)
+
+            for entry in ready:
+                seen += 1
+                yield entry
+
+            if self.reader.finished:
+                return
+            if expected_frames is not None and seen >= expected_frames:
+                return
+            if finished and not ready:
+                return
+
+            await asyncio.sleep(self.poll_interval)
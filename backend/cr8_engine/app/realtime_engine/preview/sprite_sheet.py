@@ -0,0 +1,159 @@
+# app/realtime_engine/preview/sprite_sheet.py
+import asyncio
+import base64
+import io
+import json
+import logging
+import math
+from typing import Any, Dict, List, Sequence, Tuple, Union
+from app.core.config import settings
+from .frame_index import FrameIndex
+from .frame_protocol import FrameFlags, FrameTransport, FrameCodec, build_binary_frame
+from .frame_transcoder import FrameFormat, frame_transcoder
+
+
+def sample_frames(total: int, max_frames: int) -> List[int]:
+    """Evenly spaced frame indices, always including the first and last frame"""
+    if total <= max_frames:
+        return list(range(total))
+    if max_frames <= 1:
+        return [0]
+    step = (total - 1) / (max_frames - 1)
+    return sorted({round(i * step) for i in range(max_frames)})
+
+
+def _build_sprite_sheet(sources: Sequence[str], thumb_width: int, columns: int,
+                        fmt: str, quality: int) -> Tuple[bytes, int, int]:
+    """Downscale the frames into one grid image. Runs inside a worker process."""
+    from PIL import Image
+
+    sheet = None
+    thumb_height = 0
+    rows = math.ceil(len(sources) / columns)
+
+    for cell, source in enumerate(sources):
+        with Image.open(source) as image:
+            # Let the decoder skip detail we are about to throw away
+            image.draft("RGB", (thumb_width, thumb_width))
+            if sheet is None:
+                thumb_height = max(round(image.height * thumb_width / image.width), 1)
+                sheet = Image.new("RGB", (thumb_width * columns, thumb_height * rows))
+            thumb = image.convert("RGB").resize(
+                (thumb_width, thumb_height), Image.BILINEAR)
+
+        sheet.paste(thumb, ((cell % columns) * thumb_width, (cell // columns) * thumb_height))
+
+    buffer = io.BytesIO()
+    save_args = {"quality": quality} if fmt != FrameFormat.PNG else {}
+    sheet.save(buffer, format=fmt.upper(), **save_args)
+    return buffer.getvalue(), thumb_width, thumb_height
+
+
+class SpriteSheet:
+    """
+    Downscaled thumbnails of one render packed into a single image.
+
+    Cell ``n`` (row-major, ``columns`` per row) holds the thumbnail of
+    ``frames[n]``, so the scrub bar can show any frame by cropping one cached
+    image instead of fetching full-size frames.
+    """
+
+    def __init__(self, payload: bytes, codec: int, frames: List[int], total_frames: int,
+                 columns: int, thumb_width: int, thumb_height: int):
+        self.payload = payload
+        self.codec = codec
+        self.frames = frames
+        self.total_frames = total_frames
+        self.columns = columns
+        self.thumb_width = thumb_width
+        self.thumb_height = thumb_height
+        self._messages: Dict[str, Union[bytes, str]] = {}
+
+    def layout(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "total_frames": self.total_frames,
+            "columns": self.columns,
+            "rows": math.ceil(len(self.frames) / self.columns),
+            "thumb_width": self.thumb_width,
+            "thumb_height": self.thumb_height,
+            "mime_type": FrameCodec.mime_type(self.codec),
+        }
+
+    def message(self, transport: str) -> Union[bytes, str]:
+        """The sheet image as a wire message; the layout goes out separately for binary"""
+        if transport not in self._messages:
+            if transport == FrameTransport.BINARY:
+                self._messages[transport] = build_binary_frame(
+                    self.payload, 0, self.total_frames, self.codec, FrameFlags.SPRITE_SHEET)
+            else:
+                self._messages[transport] = json.dumps({
+                    "type": "sprite_sheet",
+                    **self.layout(),
+                    "data": base64.b64encode(self.payload).decode(),
+                })
+        return self._messages[transport]
+
+
+class SpriteSheetBuilder:
+    """
+    Builds one sprite sheet per user and render generation in the background.
+
+    Concurrent requests for the same render share a single build, and only the
+    latest render of each user is kept.
+    """
+
+    def __init__(self, thumb_width: int, columns: int, max_frames: int,
+                 fmt: str, quality: int):
+        self.logger = logging.getLogger(__name__)
+        self.thumb_width = thumb_width
+        self.columns = max(columns, 1)
+        self.max_frames = max(max_frames, 1)
+        self.fmt = FrameFormat.normalize(fmt)
+        self.quality = quality
+        self._builds: Dict[str, Tuple[int, asyncio.Task]] = {}
+
+    def schedule(self, username: str, frames: FrameIndex) -> asyncio.Task:
+        """Start building the sheet for a completed render unless it is built or building"""
+        build = self._builds.get(username)
+        if build and build[0] == frames.generation:
+            task = build[1]
+            if not task.done() or (not task.cancelled() and task.exception() is None):
+                return task
+
+        if build and not build[1].done():
+            build[1].cancel()
+
+        task = asyncio.create_task(self._build(frames))
+        self._builds[username] = (frames.generation, task)
+        return task
+
+    async def get(self, username: str, frames: FrameIndex) -> SpriteSheet:
+        return await asyncio.shield(self.schedule(username, frames))
+
+    def invalidate(self, username: str) -> None:
+        build = self._builds.pop(username, None)
+        if build and not build[1].done():
+            build[1].cancel()
+
+    async def _build(self, frames: FrameIndex) -> SpriteSheet:
+        indices = sample_frames(len(frames), self.max_frames)
+        columns = min(self.columns, len(indices))
+        payload, thumb_width, thumb_height = await frame_transcoder.run(
+            _build_sprite_sheet, [str(frames[i]) for i in indices],
+            self.thumb_width, columns, self.fmt, self.quality)
+
+        self.logger.info(
+            f"Built sprite sheet of {len(indices)} frames ({len(payload)} bytes)")
+        return SpriteSheet(payload, FrameFormat.CODECS[self.fmt], indices, len(frames),
+                           columns, thumb_width, thumb_height)
+
+
+# Shared by every session on this server
+sprite_sheets = SpriteSheetBuilder(
+    settings.PREVIEW_SPRITE_THUMB_WIDTH,
+    settings.PREVIEW_SPRITE_COLUMNS,
+    settings.PREVIEW_SPRITE_MAX_FRAMES,
+    settings.PREVIEW_SPRITE_FORMAT,
+    settings.PREVIEW_FRAME_QUALITY,
+)
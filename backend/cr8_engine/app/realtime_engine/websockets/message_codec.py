@@ -0,0 +1,64 @@
+# app/realtime_engine/websockets/message_codec.py
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCodec:
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+    @staticmethod
+    def supported() -> List[str]:
+        """Codecs this server can speak, most compact first"""
+        return [MessageCodec.MSGPACK, MessageCodec.JSON] if msgpack else [MessageCodec.JSON]
+
+    @staticmethod
+    def negotiate(offered: Optional[List[str]]) -> str:
+        """The first offered codec the server supports, JSON otherwise"""
+        supported = MessageCodec.supported()
+        return next((codec for codec in offered or [] if codec in supported), MessageCodec.JSON)
+
+
+async def receive_message(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    Receive one message in either codec: text frames carry JSON and binary
+    frames MessagePack, so a peer may switch codecs at any message.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("bytes") is not None:
+        if not msgpack:
+            raise ValueError("Received a binary message but msgpack is not installed")
+        return msgpack.unpackb(message["bytes"], raw=False)
+    return json.loads(message["text"])
+
+
+class BlenderLink:
+    """
+    The Blender socket of a session, sending in the codec negotiated with
+    that Blender instance. Starts as JSON until Blender asks for another.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.codec = MessageCodec.JSON
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        if self.codec == MessageCodec.MSGPACK:
+            await self.websocket.send_bytes(msgpack.packb(data, use_bin_type=True))
+        else:
+            await self.websocket.send_json(data)
+
+    async def close(self, code: int = 1000) -> None:
+        await self.websocket.close(code)
@@ -0,0 +1,121 @@
+# app/realtime_engine/websockets/render_queue.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class RenderQueue:
+    """
+    Per-session queue of preview render requests with supersede semantics.
+
+    At most one request waits and at most one renders. A new request
+    replaces the waiting one, and is only dispatched once no newer request
+    arrived for the debounce window, so a burst of slider changes results
+    in a single render of the last state. Only the debounce wait is ever
+    cancelled by a new request; dispatches run one at a time and each sets
+    in_flight before the next one starts, so a dispatched render is never
+    lost half way.
+    """
+
+    def __init__(self, debounce: float = 0.3):
+        self.logger = logging.getLogger(__name__)
+        self.debounce = max(debounce, 0.0)
+        self.pending: Optional[Dict[str, Any]] = None
+        # Render id of the request Blender is working on
+        self.in_flight: Optional[str] = None
+        self.superseded = 0
+        self.dispatched = 0
+        self._dispatch: Optional[Callable[[Dict[str, Any]], Awaitable[Optional[str]]]] = None
+        # Task waiting out the debounce window, and the task dispatching
+        self._timer: Optional[asyncio.Task] = None
+        self._dispatching: Optional[asyncio.Task] = None
+        self._dispatch_lock = asyncio.Lock()
+        self._submitted_at = None
+        # Called with state() whenever the queue changes, to report it to the browser
+        self.on_change: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def submit(self, request: Dict[str, Any],
+               dispatch: Callable[[Dict[str, Any]], Awaitable[Optional[str]]]) -> None:
+        """Queue a request, replacing a waiting one and restarting the debounce window"""
+        if self.pending is not None:
+            self.superseded += 1
+        self.pending = request
+        self._dispatch = dispatch
+
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        self._submitted_at = asyncio.get_running_loop().time()
+        self._timer = asyncio.create_task(self._dispatch_after_debounce())
+        self._notify()
+
+    async def _dispatch_after_debounce(self) -> None:
+        await asyncio.sleep(self.debounce)
+
+        # From here on a newer request starts its own timer instead of
+        # cancelling this task, and waits for this dispatch to finish
+        self._timer = None
+        async with self._dispatch_lock:
+            request, dispatch = self.pending, self._dispatch
+            self.pending = None
+            self._dispatch = None
+            if request is None:
+                return
+
+            self._dispatching = asyncio.current_task()
+            try:
+                render_id = await dispatch(request)
+            except Exception as e:
+                self.logger.error(f"Error dispatching render request: {e}")
+                return
+            finally:
+                self._dispatching = None
+
+            if render_id:
+                self.in_flight = render_id
+                self.dispatched += 1
+            self._notify()
+
+    def supersede_in_flight(self) -> Optional[str]:
+        """Forget the render in progress and return its id so it can be cancelled"""
+        render_id = self.in_flight
+        if render_id:
+            self.in_flight = None
+            self.superseded += 1
+            self._notify()
+        return render_id
+
+    def finish(self, render_id: Optional[str]) -> bool:
+        """Mark a render as done (completed, failed or cancelled)"""
+        if render_id and render_id == self.in_flight:
+            self.in_flight = None
+            self._notify()
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Drop the waiting request and forget the render in progress"""
+        for task in (self._timer, self._dispatching):
+            if task and not task.done():
+                task.cancel()
+        self._timer = None
+        self._dispatching = None
+        self.pending = None
+        self._dispatch = None
+        self.in_flight = None
+
+    def _notify(self) -> None:
+        if self.on_change:
+            self.on_change(self.state())
+
+    def state(self) -> Dict[str, Any]:
+        dispatch_in_ms = None
+        if self.pending is not None and self._submitted_at is not None:
+            elapsed = asyncio.get_running_loop().time() - self._submitted_at
+            dispatch_in_ms = round(max(self.debounce - elapsed, 0.0) * 1000)
+        return {
+            "queued": self.pending is not None,
+            "dispatch_in_ms": dispatch_in_ms,
+            "in_flight": self.in_flight,
+            "superseded": self.superseded,
+            "dispatched": self.dispatched,
+        }
@@ -1,9 +1,19 @@
 # app/websockets/session_manager.py
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 import asyncio
 import logging
 from fastapi import WebSocket, WebSocketDisconnect
 from app.services.blender_service import BlenderService
+from app.realtime_engine.preview.frame_cache import frame_cache
+from app.realtime_engine.preview.frame_packet import FramePacket
+from app.realtime_engine.preview.frame_index import FrameIndex, PlaybackRange
+from app.realtime_engine.preview.frame_transcoder import FrameFormat
+from app.realtime_engine.preview.fmp4_stream import VideoSegmentPacket
+from app.realtime_engine.preview.sprite_sheet import sprite_sheets
+from app.core.config import settings
+from .viewer import Viewer
+from .render_queue import RenderQueue
+from .message_codec import BlenderLink
 
 
 class SessionState:
@@ -12,23 +22,119 @@ class SessionState:
     DISCONNECTED = "disconnected"
 
 
+class PreviewMode:
+    FRAMES = "frames"
+    FMP4 = "fmp4"
+
+    ALL = (FRAMES, FMP4)
+
+
 class Session:
     def __init__(self, username: str, browser_socket: Optional[WebSocket] = None):
         self.username = username
+        # The controlling browser; every subscribed browser is also a viewer
         self.browser_socket = browser_socket
+        self.viewers: Dict[WebSocket, Viewer] = {}
+        if browser_socket:
+            self.add_viewer(browser_socket)
         self.blender_socket = None
         self.is_active = True
         self.state = SessionState.DISCONNECTED
         self.connection_timeout = 30  # seconds to wait for Blender to connect
         self.should_broadcast = False
         self.last_frame_index = -1
+        # Progressive streaming: push frames while Blender is still rendering
+        self.stream_preview = False
+        self.render_finished = asyncio.Event()
+        self.render_finished.set()  # nothing is rendering yet
+        # Bumped for every start_preview_rendering, keys the frame cache
+        self.render_generation = 0
+        # Generation a live stream already sent every frame of, Blender's
+        # start_broadcast must not replay it
+        self.streamed_generation: Optional[int] = None
+        # Last preview_video_ready from Blender: render_id, video file name and fps
+        self.preview_video: Optional[Dict[str, Any]] = None
+        # Id Blender writes into the frame manifest for the current render
+        self.render_id: Optional[str] = None
+        self.frame_index: Optional[FrameIndex] = None
+        # Range, step, fps and looping requested with start_broadcast; the version
+        # tells a running broadcast to pick up a seek without being restarted
+        self.playback = PlaybackRange()
+        self.playback_version = 0
+        # Broadcast pacing: scene fps reported by Blender
+        self.preview_fps = 30.0
+        self.pacer = None
+        # Encoding of broadcast frames, selected by the browser in start_broadcast
+        self.frame_format = FrameFormat.PNG
+        self.frame_quality = settings.PREVIEW_FRAME_QUALITY
+        # Send changed tiles instead of full frames, opt-in via start_broadcast
+        self.delta_encoding = False
+        # "frames" sends individual images, "fmp4" a fragmented MP4 stream for MSE
+        self.preview_mode = PreviewMode.FRAMES
+        # Debounced preview requests, a newer one supersedes queued and running renders
+        self.render_queue = RenderQueue(settings.PREVIEW_RENDER_DEBOUNCE)
+        self.render_queue.on_change = lambda state: self.broadcast_json(
+            {"type": "render_queue", **state})
         self.pending_requests: Dict[str, str] = {}  # message_id -> username
+        # message_id -> browser socket that asked, its reply goes to that viewer only
+        self.pending_viewers: Dict[str, WebSocket] = {}
         self.last_connection_attempt = 0  # timestamp of last connection attempt
         self.connection_attempts = 0  # number of connection attempts
         # maximum number of connection attempts before giving up
         self.max_connection_attempts = 5
         self.base_retry_delay = 1  # base delay in seconds between retries
 
+    def add_viewer(self, websocket: WebSocket) -> Viewer:
+        """Subscribe a browser socket to this session's broadcasts"""
+        viewer = self.viewers.get(websocket)
+        if viewer is None:
+            viewer = Viewer(websocket, settings.PREVIEW_VIEWER_QUEUE_SIZE)
+            viewer.on_closed = self._forget_viewer
+            self.viewers[websocket] = viewer
+        viewer.start()
+        return viewer
+
+    def _forget_viewer(self, viewer: Viewer) -> None:
+        """Drop a viewer whose socket failed, promoting another one if it was in control"""
+        if self.viewers.get(viewer.websocket) is viewer:
+            del self.viewers[viewer.websocket]
+        if self.browser_socket is viewer.websocket:
+            self.browser_socket = next(iter(self.viewers), None)
+
+    async def remove_viewer(self, websocket: WebSocket) -> None:
+        """Unsubscribe a browser socket, promoting another viewer if it was in control"""
+        viewer = self.viewers.pop(websocket, None)
+        if viewer:
+            await viewer.close()
+
+        if self.browser_socket is websocket:
+            self.browser_socket = next(iter(self.viewers), None)
+
+    def get_viewer(self, websocket: Optional[WebSocket]) -> Optional[Viewer]:
+        return self.viewers.get(websocket) if websocket else None
+
+    def fan_out(self, packet: FramePacket) -> None:
+        """Hand an encoded frame to every viewer's send queue"""
+        for viewer in self.viewers.values():
+            viewer.offer_frame(packet)
+
+    def fan_out_segment(self, packet: VideoSegmentPacket, init: VideoSegmentPacket) -> None:
+        """
+        Hand an fMP4 segment to every viewer, sending the stream's init segment
+        first to viewers that joined after it went out.
+        """
+        for viewer in self.viewers.values():
+            if viewer.video_init is not init:
+                viewer.video_init = init
+                viewer.offer_packet(init)
+            if packet is not init:
+                viewer.offer_packet(packet)
+
+    def broadcast_json(self, message: Dict) -> None:
+        """Queue a control message for every viewer, in order with their frames"""
+        for viewer in self.viewers.values():
+            viewer.offer_message(message)
+
 
 class SessionManager:
     def __init__(self):
@@ -43,9 +149,11 @@ class SessionManager:
             if username in self.sessions:
                 session = self.sessions[username]
                 if session.is_active:
-                    if session.state == SessionState.CONNECTED:
-                        # Update the browser socket
-                        session.browser_socket = websocket
+                    if session.state == SessionState.CONNECTED or session.viewers:
+                        # Join as a viewer, only take control if nobody holds it
+                        session.add_viewer(websocket)
+                        if not session.browser_socket:
+                            session.browser_socket = websocket
                         return session
                     else:
                         # Check if we should allow a new connection attempt
@@ -101,21 +209,16 @@ class SessionManager:
         if session.state != SessionState.WAITING_FOR_BLENDER:
             raise ValueError(f"Unexpected Blender connection for {username}")
 
-        # Register the Blender socket
-        session.blender_socket = websocket
+        # Register the Blender socket, JSON until Blender negotiates a codec
+        session.blender_socket = BlenderLink(websocket)
         session.state = SessionState.CONNECTED
 
-        # Notify browser client that Blender is connected
-        if session.browser_socket:
-            try:
-                await session.browser_socket.send_json({
-                    "type": "system",
-                    "status": "blender_connected",
-                    "message": "Blender instance connected successfully"
-                })
-            except Exception as e:
-                self.logger.error(
-                    f"Error notifying browser of Blender connection: {str(e)}")
+        # Notify browser clients that Blender is connected
+        session.broadcast_json({
+            "type": "system",
+            "status": "blender_connected",
+            "message": "Blender instance connected successfully"
+        })
 
         self.logger.info(f"Blender client registered for session {username}")
 
@@ -163,17 +266,19 @@ class SessionManager:
             session.is_active = False
 
             # Close WebSocket connections
-            if session.browser_socket:
+            for websocket, viewer in list(session.viewers.items()):
+                await viewer.close()
                 try:
-                    await session.browser_socket.send_json({
+                    await websocket.send_json({
                         "type": "system",
                         "status": "session_closed",
                         "message": "Session terminated"
                     })
-                    await session.browser_socket.close()
+                    await websocket.close()
                 except Exception as e:
                     self.logger.error(
                         f"Error closing browser socket: {str(e)}")
+            session.viewers.clear()
 
             if session.blender_socket:
                 try:
@@ -185,6 +290,10 @@ class SessionManager:
             # Terminate Blender instance
             await BlenderService.terminate_instance(username)
 
+            session.render_queue.clear()
+            frame_cache.invalidate(username)
+            sprite_sheets.invalidate(username)
+
             # Remove session
             del self.sessions[username]
             self.logger.info(f"Cleaned up session for {username}")
@@ -207,12 +316,17 @@ class SessionManager:
             self.logger.warning(
                 f"No {target} socket found for {from_username}")
 
-    async def handle_disconnect(self, username: str, client_type: str):
+    async def handle_disconnect(self, username: str, client_type: str, websocket: Optional[WebSocket] = None):
         """Handle client disconnection"""
         if username in self.sessions:
             session = self.sessions[username]
 
             if client_type == "browser":
+                if websocket is not None:
+                    await session.remove_viewer(websocket)
+                    if session.viewers:
+                        # Other viewers are still watching, keep the session
+                        return
                 session.browser_socket = None
                 session.last_connection_attempt = asyncio.get_event_loop().time()
                 session.connection_attempts += 1
@@ -233,22 +347,19 @@ class SessionManager:
             else:  # blender
                 session.blender_socket = None
                 session.state = SessionState.DISCONNECTED
+                # Whatever was queued or rendering is lost with the instance
+                session.render_queue.clear()
 
                 # Reset connection attempts when Blender disconnects
                 session.connection_attempts = 0
 
-                # Notify browser if it's still connected
-                if session.browser_socket:
-                    try:
-                        await session.browser_socket.send_json({
-                            "type": "system",
-                            "status": "blender_disconnected",
-                            "message": "Blender instance disconnected. Attempting to reconnect...",
-                            "shouldReconnect": True
-                        })
-                    except Exception as e:
-                        self.logger.error(
-                            f"Error notifying browser of Blender disconnect: {str(e)}")
+                # Notify browsers that are still connected
+                session.broadcast_json({
+                    "type": "system",
+                    "status": "blender_disconnected",
+                    "message": "Blender instance disconnected. Attempting to reconnect...",
+                    "shouldReconnect": True
+                })
 
                 # Don't immediately clean up - give time for reconnection
                 await asyncio.sleep(5)
@@ -259,11 +370,14 @@ class SessionManager:
         """Get a session by username"""
         return self.sessions.get(username)
 
-    def add_pending_request(self, username: str, message_id: str) -> None:
-        """Add a pending request to the user's session"""
+    def add_pending_request(self, username: str, message_id: str,
+                            websocket: Optional[WebSocket] = None) -> None:
+        """Add a pending request to the user's session, remembering the browser that sent it"""
         session = self.sessions.get(username)
         if session:
             session.pending_requests[message_id] = username
+            if websocket is not None:
+                session.pending_viewers[message_id] = websocket
             self.logger.debug(
                 f"Added pending request {message_id} for {username}")
 
@@ -279,5 +393,6 @@ class SessionManager:
         for session in self.sessions.values():
             if message_id in session.pending_requests:
                 del session.pending_requests[message_id]
+                session.pending_viewers.pop(message_id, None)
                 self.logger.debug(f"Removed pending request {message_id}")
                 break
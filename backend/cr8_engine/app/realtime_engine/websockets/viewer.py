@@ -0,0 +1,146 @@
+# app/realtime_engine/websockets/viewer.py
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Union
+from fastapi import WebSocket
+from app.realtime_engine.preview.broadcast_pacer import BroadcastPacer
+from app.realtime_engine.preview.frame_packet import FramePacket
+from app.realtime_engine.preview.frame_protocol import FrameTransport
+
+
+class Viewer:
+    """
+    A browser socket subscribed to a session's preview broadcast.
+
+    Every viewer has its own bounded send queue drained by its own task, so
+    a slow viewer only drops its own frames and never stalls the broadcast
+    or the other viewers. Control messages are queued too, keeping them in
+    order with the frames, but are never dropped.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int = 8):
+        self.logger = logging.getLogger(__name__)
+        self.websocket = websocket
+        self.queue_size = max(queue_size, 1)
+        # Negotiated per browser connection, JSON/base64 until the browser opts in
+        self.frame_transport = FrameTransport.JSON
+        # Per viewer credit window, see BroadcastPacer
+        self.flow = BroadcastPacer()
+        # False until the viewer holds the reference image delta frames build on
+        self.in_sync = False
+        self.queue_drops = 0
+        # Init segment of the fMP4 stream this viewer's SourceBuffer was set up with
+        self.video_init = None
+        self._queue: Deque[Union[FramePacket, Any, Dict[str, Any]]] = deque()
+        self._queued_frames = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Set once the socket failed or the viewer was closed, nothing is queued after
+        self.closed = False
+        # Called when sending fails, so the session can forget this viewer
+        self.on_closed: Optional[Callable[["Viewer"], None]] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._mark_closed()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def set_ack_window(self, ack_window: Optional[int], fps: float) -> None:
+        self.flow = BroadcastPacer(fps, ack_window)
+
+    def _mark_closed(self) -> None:
+        self.closed = True
+        self._queue.clear()
+        self._queued_frames = 0
+
+    def offer_frame(self, packet: FramePacket) -> None:
+        """Queue a frame without waiting, dropping this viewer's oldest frame when full"""
+        if self.closed:
+            return
+        if self._queued_frames >= self.queue_size:
+            for position, item in enumerate(self._queue):
+                if isinstance(item, FramePacket):
+                    del self._queue[position]
+                    self._queued_frames -= 1
+                    self.queue_drops += 1
+                    self.in_sync = False
+                    break
+
+        self._queue.append(packet)
+        self._queued_frames += 1
+        self._ready.set()
+
+    def offer_message(self, message: Dict[str, Any]) -> None:
+        """Queue a JSON control message behind any frames already queued"""
+        if self.closed:
+            return
+        self._queue.append(message)
+        self._ready.set()
+
+    def offer_packet(self, packet) -> None:
+        """
+        Queue a packet that must arrive (fMP4 segments, sprite sheets), never
+        dropped. Anything with a message(transport) method can be queued.
+        """
+        if self.closed:
+            return
+        self._queue.append(packet)
+        self._ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            item = self._queue.popleft()
+            try:
+                if isinstance(item, FramePacket):
+                    self._queued_frames -= 1
+                    await self._send_packet(item)
+                elif isinstance(item, dict):
+                    await self.websocket.send_json(item)
+                else:
+                    await self._send_message(item.message(self.frame_transport))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error sending to viewer, dropping it: {e}")
+                self._mark_closed()
+                if self.on_closed:
+                    self.on_closed(self)
+                return
+
+    async def _send_packet(self, packet: FramePacket) -> None:
+        if not await self.flow.wait_for_credit(self.flow.frame_interval):
+            self.flow.record_drop()
+            self.in_sync = False
+            return
+
+        await self._send_message(packet.message(self.frame_transport, use_delta=self.in_sync))
+        self.flow.record_sent()
+        self.in_sync = True
+
+    async def _send_message(self, message: Union[bytes, str]) -> None:
+        if isinstance(message, bytes):
+            await self.websocket.send_bytes(message)
+        else:
+            await self.websocket.send_text(message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.flow.stats(),
+            "queue_drops": self.queue_drops,
+            "queued_frames": self._queued_frames,
+        }
@@ -1,21 +1,42 @@
 # app/websockets/websocket_handler.py
 import asyncio
 import logging
-import base64
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 import uuid
 from fastapi import WebSocket
 from app.core.config import settings
+from app.realtime_engine.preview.frame_protocol import (
+    FrameTransport,
+    FRAME_HEADER,
+    FRAME_PROTOCOL_VERSION,
+)
+from app.realtime_engine.preview.frame_packet import FramePacket
+from app.realtime_engine.preview.frame_watcher import FrameWatcher
+from app.realtime_engine.preview.frame_manifest import FrameManifestReader
+from app.realtime_engine.preview.frame_cache import frame_cache
+from app.realtime_engine.preview.broadcast_pacer import BroadcastPacer
+from app.realtime_engine.preview.frame_transcoder import FrameFormat, frame_transcoder
+from app.realtime_engine.preview.delta_codec import DeltaEncoder
+from app.realtime_engine.preview.frame_index import FrameIndex, PlaybackRange
+from app.realtime_engine.preview.fmp4_stream import FMP4_MIME_TYPE, ffmpeg_pool
+from app.realtime_engine.preview.sprite_sheet import sprite_sheets
+from app.services.video_export_service import VideoPreset, video_export_service
+from app.services.template_ingestion_service import TemplateIngestionService
+from app.db.session import get_db
+from .session_manager import PreviewMode
+from .message_codec import MessageCodec
 
 
 class WebSocketHandler:
     """Handles WebSocket message processing with session-based architecture"""
 
-    def __init__(self, session_manager, username: str):
+    def __init__(self, session_manager, username: str, websocket: Optional[WebSocket] = None):
         self.logger = logging.getLogger(__name__)
         self.session_manager = session_manager
         self.username = username
+        # The connection this handler serves, identifies the viewer for browsers
+        self.websocket = websocket
         self.preview_dir = self._get_preview_dir()
 
     def _get_preview_dir(self):
@@ -64,7 +85,22 @@ class WebSocketHandler:
                 "start_preview_rendering": self._handle_preview_rendering,
                 "stop_broadcast": self._handle_stop_broadcast,
                 "start_broadcast": self._handle_start_broadcast,
+                "negotiate_frame_transport": self._handle_negotiate_frame_transport,
+                "negotiate_codec": self._handle_negotiate_codec,
+                "preview_render_started": self._handle_preview_render_started,
+                "render_progress": self._handle_render_progress,
+                "cancel_render": self._handle_cancel_render,
+                "render_cancelled": self._handle_render_cancelled,
+                "preview_video_ready": self._handle_preview_video_ready,
+                "Preview Rendering failed": self._handle_preview_render_failed,
+                "frame_ack": self._handle_frame_ack,
+                "get_sprite_sheet": self._handle_get_sprite_sheet,
                 "generate_video": self._handle_generate_video,
+                "video_export_status": self._handle_video_export_status,
+                "apply_scene_config": self._handle_apply_scene_config,
+                "scene_config_result": self._handle_scene_config_result,
+                "get_stats": self._handle_get_stats,
+                "handler_stats": self._handle_handler_stats,
                 "get_template_controls": self._handle_get_template_controls,
                 "template_controls": self._handle_template_controls_response
             }
@@ -91,31 +127,133 @@ class WebSocketHandler:
                     })
 
     async def _handle_preview_rendering(self, username: str, data: Dict[str, Any], client_type: str):
-        """Handle preview rendering requests"""
+        """Queue preview rendering requests, the newest request supersedes older ones"""
         if client_type != "browser":
             return
 
+        session = self.session_manager.get_session(username)
+        if not session or not session.blender_socket:
+            await self._send_error(username, "Blender client not connected")
+            return
+
+        # Stop the render in progress right away, nobody will watch it
+        await self._cancel_in_flight_render(session)
+
+        session.render_queue.submit(
+            data, lambda request: self._dispatch_preview_rendering(username, request))
+
+    async def _cancel_in_flight_render(self, session) -> None:
+        superseded = session.render_queue.supersede_in_flight()
+        if superseded and session.blender_socket:
+            await session.blender_socket.send_json({
+                "command": "cancel_render",
+                "message_id": str(uuid.uuid4()),
+                "render_id": superseded
+            })
+
+    async def _dispatch_preview_rendering(self, username: str, data: Dict[str, Any]) -> Optional[str]:
+        """Send a debounced preview request to Blender and return its render id"""
         message_id = str(uuid.uuid4())
         session = self.session_manager.get_session(username)
         self.session_manager.add_pending_request(username, message_id)
         if not session or not session.blender_socket:
             await self._send_error(username, "Blender client not connected")
-            return
+            return None
+
+        # A render dispatched while this request waited out the debounce
+        await self._cancel_in_flight_render(session)
+
+        # Streaming is opt-in per request, frames are pushed as Blender writes them
+        session.stream_preview = bool(data.get("stream", False))
+        if not await self._apply_preview_mode(username, session, data):
+            return None
+        session.render_finished.clear()
+
+        # Frames of the previous render are stale from here on
+        if hasattr(session, 'broadcast_task') and not session.broadcast_task.done():
+            session.should_broadcast = False
+            session.broadcast_task.cancel()
+        session.render_generation += 1
+        session.render_id = message_id
+        session.frame_index = None
+        session.last_frame_index = -1
+        frame_cache.invalidate(username)
+        sprite_sheets.invalidate(username)
 
         command = {
             "command": data.get("command"),
             "params": data.get("params"),
-            "message_id": message_id
+            "message_id": message_id,
+            # Tags every record of this render in the frame manifest
+            "render_id": message_id
         }
 
         await session.blender_socket.send_json(command)
-        await session.browser_socket.send_json({
+        self._reply(session, {
             "status": "OK",
             "message": "Preview rendering started"
         })
+        return message_id
 
     async def _handle_generate_video(self, username: str, data: Dict[str, Any], client_type: str):
-        """Handle video generation requests"""
+        """
+        Export the current preview render as video on the server, so the Blender
+        instance keeps serving the session
+        """
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        if not session.render_finished.is_set():
+            await self._send_error(username, "Preview render still in progress")
+            return
+
+        reader = FrameManifestReader(self.preview_dir, session.render_id)
+        entries = await asyncio.to_thread(reader.poll)
+        if not entries or reader.status != "completed":
+            await self._send_error(username, "No completed preview render to export")
+            return
+
+        def on_done(job):
+            session.broadcast_json({"type": "video_generation_complete", **job.to_dict()})
+
+        reuse = {}
+        video = session.preview_video or {}
+        if video.get("video") and video.get("render_id") == session.render_id \
+                and video.get("fps") == session.preview_fps:
+            # Blender encoded it with the h264_web settings while the frames rendered
+            reuse[VideoPreset.H264_WEB] = self.preview_dir / video["video"]
+
+        try:
+            job = video_export_service.submit(
+                username,
+                [entry.path for entry in entries],
+                [entry.sha1 or entry.file for entry in entries],
+                session.preview_fps,
+                data.get("presets"),
+                on_done=on_done,
+                reuse=reuse
+            )
+        except ValueError as e:
+            await self._send_error(username, str(e))
+            return
+
+        if job.done:
+            # Exported before, served from the export cache
+            on_done(job)
+            return
+
+        self._reply(session, {
+            "type": "video_export",
+            "message_id": data.get("message_id"),
+            **job.to_dict()
+        })
+
+    async def _handle_apply_scene_config(self, username: str, data: Dict[str, Any], client_type: str):
+        """Forward a whole scene configuration to Blender to be applied in one pass"""
         if client_type != "browser":
             return
 
@@ -124,33 +262,265 @@ class WebSocketHandler:
             await self._send_error(username, "Blender client not connected")
             return
 
-        await session.blender_socket.send_json(data)
-        await session.browser_socket.send_json({
-            "status": "OK",
-            "message": "Video generation started"
+        message_id = data.get("message_id") or str(uuid.uuid4())
+        self.session_manager.add_pending_request(username, message_id)
+        await session.blender_socket.send_json({
+            "command": "apply_scene_config",
+            "config": data.get("config") or {},
+            "message_id": message_id
         })
 
+    async def _handle_scene_config_result(self, username: str, data: Dict[str, Any], client_type: str):
+        """Relay Blender's aggregated scene configuration result to the viewers"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        result = data.get("data") or {}
+        message_id = result.get("message_id")
+        if message_id:
+            self.session_manager.remove_pending_request(message_id)
+        session.broadcast_json({"type": "scene_config_result", **result})
+
+    async def _handle_get_stats(self, username: str, data: Dict[str, Any], client_type: str):
+        """Ask Blender for its command handling counters"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session or not session.blender_socket:
+            await self._send_error(username, "Blender client not connected")
+            return
+
+        message_id = data.get("message_id") or str(uuid.uuid4())
+        self.session_manager.add_pending_request(username, message_id)
+        await session.blender_socket.send_json({"command": "get_stats", "message_id": message_id})
+
+    async def _handle_handler_stats(self, username: str, data: Dict[str, Any], client_type: str):
+        """Relay Blender's command handling counters to the viewers"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        stats = data.get("data") or {}
+        message_id = stats.get("message_id")
+        if message_id:
+            self.session_manager.remove_pending_request(message_id)
+        session.broadcast_json({"type": "handler_stats", **stats})
+
+    async def _handle_video_export_status(self, username: str, data: Dict[str, Any], client_type: str):
+        """Report the state of a video export job"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        job = video_export_service.get(data.get("job_id"))
+        if not session:
+            return
+        if not job or username not in job.owners:
+            await self._send_error(username, f"Unknown video export job: {data.get('job_id')}")
+            return
+
+        self._reply(session, {"type": "video_export", **job.to_dict()})
+
+    def _reply(self, session, message: Dict[str, Any]) -> None:
+        """
+        Queue a message for the browser this handler serves, behind the frames
+        already queued for it. Replies to Blender's messages go to the
+        controlling browser.
+        """
+        viewer = session.get_viewer(self.websocket) or session.get_viewer(session.browser_socket)
+        if viewer:
+            viewer.offer_message(message)
+
     async def _handle_start_broadcast(self, username: str, data: Dict[str, Any], client_type: str):
         """Start/resume frame broadcasting from the last frame or the beginning"""
         session = self.session_manager.get_session(username)
         if not session:
             return
 
+        if client_type == "blender":
+            # Blender finished rendering
+            session.render_finished.set()
+            session.render_queue.finish(session.render_id)
+            self._update_render_info(session, data.get("data"))
+            # Scrub bar thumbnails are built once per render, off the broadcast path
+            asyncio.create_task(self._prepare_sprite_sheet(username))
+            # A running stream drains the remaining frames, a finished one sent them all
+            if session.stream_preview and (
+                    session.streamed_generation == session.render_generation
+                    or (hasattr(session, 'broadcast_task') and not session.broadcast_task.done())):
+                return
+
+        viewer = session.get_viewer(self.websocket) if client_type == "browser" else None
+        if viewer and "ack_window" in data:
+            # Credit based flow control is opt-in per viewer, 0/None disables it
+            viewer.set_ack_window(data.get("ack_window") or None, session.preview_fps)
+
+        if client_type == "browser" and ("format" in data or "quality" in data):
+            try:
+                session.frame_format = FrameFormat.normalize(
+                    data.get("format", session.frame_format))
+            except ValueError as e:
+                await self._send_error(username, str(e))
+                return
+            quality = int(data.get("quality", session.frame_quality))
+            session.frame_quality = max(1, min(quality, 100))
+
+        if client_type == "browser" and "delta" in data:
+            session.delta_encoding = bool(data.get("delta"))
+
+        if client_type == "browser" and not await self._apply_preview_mode(username, session, data):
+            return
+
+        running = hasattr(session, 'broadcast_task') and not session.broadcast_task.done()
+
+        playback_fields = ("start_frame", "end_frame", "step", "fps", "loop")
+        if client_type == "browser" and any(field in data for field in playback_fields):
+            # A running broadcast picks this up on its next frame (seek, re-range, re-time)
+            session.playback = PlaybackRange.from_message(data, session.playback)
+            session.playback_version += 1
+
         # Do not reset last_frame_index; resume from where it left off
         session.should_broadcast = True
 
         # Create new task only if none exists or previous completed
-        if not hasattr(session, 'broadcast_task') or session.broadcast_task.done():
-            session.broadcast_task = asyncio.create_task(
-                self._broadcast_frames(username)
-            )
+        if not running:
+            broadcast = self._broadcast_video(username) \
+                if session.preview_mode == PreviewMode.FMP4 else self._broadcast_frames(username)
+            session.broadcast_task = asyncio.create_task(broadcast)
 
         # Notify client
-        if session.browser_socket:
-            await session.browser_socket.send_json({
-                "status": "OK",
-                "message": "Frame broadcast started/resumed"
-            })
+        self._reply(session, {
+            "status": "OK",
+            "message": "Playback updated" if running else "Frame broadcast started/resumed"
+        })
+
+    async def _handle_preview_render_started(self, username: str, data: Dict[str, Any], client_type: str):
+        """Start streaming frames as soon as Blender begins writing them"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        render_info = data.get("data") or {}
+        self._update_render_info(session, render_info)
+        if not session.stream_preview:
+            return
+
+        expected_frames = render_info.get("frame_count")
+
+        # A new render replaces whatever was being broadcast
+        if hasattr(session, 'broadcast_task') and not session.broadcast_task.done():
+            session.broadcast_task.cancel()
+
+        session.should_broadcast = True
+        session.last_frame_index = -1
+        stream = self._broadcast_video(username, expected_frames, live=True) \
+            if session.preview_mode == PreviewMode.FMP4 \
+            else self._stream_frames(username, expected_frames)
+        session.broadcast_task = asyncio.create_task(stream)
+
+        session.broadcast_json({
+            "status": "OK",
+            "message": "Frame streaming started",
+            "total_frames": expected_frames
+        })
+
+    async def _handle_render_progress(self, username: str, data: Dict[str, Any], client_type: str):
+        """Relay Blender's per-frame render progress to every viewer"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        progress = data.get("data") or {}
+        # Progress of a superseded render is of no interest to anyone
+        if session and progress.get("render_id") == session.render_id:
+            session.broadcast_json({"type": "render_progress", **progress})
+
+    async def _handle_cancel_render(self, username: str, data: Dict[str, Any], client_type: str):
+        """Ask Blender to stop the preview render in progress"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session or not session.blender_socket:
+            await self._send_error(username, "Blender client not connected")
+            return
+
+        await session.blender_socket.send_json({
+            "command": "cancel_render",
+            "message_id": str(uuid.uuid4()),
+            "render_id": session.render_id
+        })
+
+    async def _handle_render_cancelled(self, username: str, data: Dict[str, Any], client_type: str):
+        """Blender stopped a render; a stream of it ends at the manifest end record"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        result = data.get("data") or {}
+        if result.get("render_id") != session.render_id:
+            return  # Superseded by a newer render, which is still running
+
+        if data.get("status") == "success":
+            session.render_finished.set()
+            session.render_queue.finish(session.render_id)
+        session.broadcast_json({
+            "type": "render_cancelled",
+            "success": data.get("status") == "success",
+            **result
+        })
+
+    async def _handle_preview_video_ready(self, username: str, data: Dict[str, Any], client_type: str):
+        """Blender finished the MP4 encoded while the current preview rendered"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        result = data.get("data") or {}
+        if result.get("render_id") != session.render_id:
+            return  # The video of an older render
+
+        session.preview_video = result
+        session.broadcast_json({
+            "type": "preview_video_ready",
+            "render_id": session.render_id,
+            "file": result.get("video")
+        })
+
+    async def _handle_preview_render_failed(self, username: str, data: Dict[str, Any], client_type: str):
+        """Blender could not render the current preview"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        result = data.get("data") or {}
+        if not session or result.get("render_id") != session.render_id:
+            return
+
+        session.render_finished.set()
+        session.render_queue.finish(session.render_id)
+        session.broadcast_json({
+            "status": "ERROR",
+            "message": "Preview rendering failed",
+            "render_id": session.render_id
+        })
 
     async def _handle_stop_broadcast(self, username: str, data: Dict[str, Any], client_type: str):
         """Stop frame broadcasting immediately"""
@@ -173,55 +543,276 @@ class WebSocketHandler:
                     self.logger.error(f"Error stopping broadcast: {e}")
 
         # Notify client
-        if session.browser_socket:
-            await session.browser_socket.send_json({
-                "status": "OK",
-                "message": "Frame broadcast stopped"
+        self._reply(session, {
+            "status": "OK",
+            "message": "Frame broadcast stopped",
+            "stats": session.pacer.stats() if session.pacer else None
+        })
+
+    async def _handle_frame_ack(self, username: str, data: Dict[str, Any], client_type: str):
+        """Return a send credit to the running broadcast"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        viewer = session.get_viewer(self.websocket) if session else None
+        if viewer:
+            viewer.flow.acknowledge()
+
+    async def _apply_preview_mode(self, username: str, session, data: Dict[str, Any]) -> bool:
+        """Switch between frame and fMP4 broadcasting when the browser asks for a mode"""
+        if "mode" not in data:
+            return True
+        mode = data.get("mode")
+        if mode not in PreviewMode.ALL:
+            await self._send_error(username, f"Unsupported preview mode: {mode}")
+            return False
+        session.preview_mode = mode
+        return True
+
+    async def _handle_get_sprite_sheet(self, username: str, data: Dict[str, Any], client_type: str):
+        """Send the scrub bar sprite sheet of the current render to the requesting viewer"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        viewer = session.get_viewer(self.websocket) if session else None
+        if not viewer:
+            return
+
+        if not session.render_finished.is_set():
+            await self._send_error(username, "Preview render still in progress")
+            return
+
+        frames = await self._get_frame_index(session)
+        if not frames or not frames.complete:
+            await self._send_error(username, "No preview frames to build a sprite sheet from")
+            return
+
+        # Building can take a moment, do not hold up this socket's other messages
+        asyncio.create_task(self._send_sprite_sheet(username, viewer, frames))
+
+    async def _send_sprite_sheet(self, username: str, viewer, frames: FrameIndex):
+        try:
+            sheet = await sprite_sheets.get(username, frames)
+        except asyncio.CancelledError:
+            return  # A newer render replaced this one
+        except Exception as e:
+            self.logger.error(f"Sprite sheet error: {e}")
+            viewer.offer_message({
+                "status": "ERROR",
+                "message": f"Failed to build sprite sheet: {e}"
             })
+            return
+
+        if viewer.frame_transport == FrameTransport.BINARY:
+            # The binary message carries only the image, describe its cells first
+            viewer.offer_message({"type": "sprite_sheet", **sheet.layout()})
+        viewer.offer_packet(sheet)
+
+    async def _prepare_sprite_sheet(self, username: str):
+        """Build the sprite sheet of a finished render and tell the viewers it is ready"""
+        session = self.session_manager.get_session(username)
+        if not session:
+            return
+
+        try:
+            frames = await self._get_frame_index(session)
+            if not frames or not frames.complete:
+                return
+            sheet = await sprite_sheets.get(username, frames)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            self.logger.error(f"Sprite sheet error: {e}")
+            return
+
+        if frames.generation == session.render_generation:
+            session.broadcast_json({
+                "type": "sprite_sheet_ready",
+                "frames": len(sheet.frames),
+                "total_frames": sheet.total_frames
+            })
+
+    def _update_render_info(self, session, render_info: Optional[Dict[str, Any]]):
+        """Remember the scene timing Blender reported for the current render"""
+        if isinstance(render_info, dict) and render_info.get("fps"):
+            session.preview_fps = float(render_info["fps"])
+
+    def _send_broadcast_stats(self, session, pacer: BroadcastPacer, message_type: str = "broadcast_stats"):
+        """Queue the broadcast counters for every viewer, with that viewer's own delivery stats"""
+        for viewer in session.viewers.values():
+            viewer.offer_message({
+                "type": message_type,
+                "stats": {**pacer.stats(), "viewers": len(session.viewers)},
+                "viewer": viewer.stats()
+            })
+
+    async def _handle_negotiate_frame_transport(self, username: str, data: Dict[str, Any], client_type: str):
+        """Let a browser connection opt into binary frame messages"""
+        if client_type != "browser":
+            return
+
+        session = self.session_manager.get_session(username)
+        viewer = session.get_viewer(self.websocket) if session else None
+        if not viewer:
+            return
+
+        offered = data.get("transports") or [FrameTransport.JSON]
+        if FrameTransport.BINARY in offered:
+            viewer.frame_transport = FrameTransport.BINARY
+        else:
+            viewer.frame_transport = FrameTransport.JSON
+
+        self.logger.info(
+            f"Frame transport for a viewer of {username} set to {viewer.frame_transport}")
+        viewer.offer_message({
+            "type": "frame_transport",
+            "transport": viewer.frame_transport,
+            "header_size": FRAME_HEADER.size,
+            "version": FRAME_PROTOCOL_VERSION
+        })
+
+    async def _handle_negotiate_codec(self, username: str, data: Dict[str, Any], client_type: str):
+        """Pick the message codec of the Blender link from the codecs Blender offers"""
+        if client_type != "blender":
+            return
+
+        session = self.session_manager.get_session(username)
+        if not session or not session.blender_socket:
+            return
+
+        codec = MessageCodec.negotiate(data.get("codecs"))
+        # Answered in the current codec, everything after it in the new one
+        await session.blender_socket.send_json({"command": "codec_selected", "codec": codec})
+        session.blender_socket.codec = codec
+        self.logger.info(f"Blender link of {username} uses {codec}")
+
+    def _create_delta_encoder(self, session) -> Optional[DeltaEncoder]:
+        if not session.delta_encoding:
+            return None
+        return DeltaEncoder(
+            keyframe_interval=settings.PREVIEW_DELTA_KEYFRAME_INTERVAL,
+            tile_size=settings.PREVIEW_DELTA_TILE_SIZE,
+            quality=session.frame_quality
+        )
+
+    async def _load_frame(self, username: str, session, generation: int,
+                          frame_index: int, frame: Path,
+                          fmt: Optional[str] = None) -> Tuple[bytes, int]:
+        """
+        Return the frame encoded in the session's format (or fmt) and its codec, from
+        the frame cache when possible, transcoding or reading the file on a miss
+        """
+        fmt = fmt or session.frame_format
+        quality = session.frame_quality
+        variant = fmt if fmt == FrameFormat.PNG else f"{fmt}:{quality}"
+
+        payload = frame_cache.get(username, generation, frame_index, variant)
+        if payload is None:
+            payload, _ = await frame_transcoder.transcode(frame, fmt, quality)
+            frame_cache.put(username, generation, frame_index, payload, variant)
+        return payload, FrameFormat.CODECS[fmt]
+
+    async def _get_frame_index(self, session) -> FrameIndex:
+        """Return the frame index of the current render, reading the frame manifest only once"""
+        generation = session.render_generation
+        index = session.frame_index
+        if index is not None and index.generation == generation and index.complete:
+            return index
+
+        reader = FrameManifestReader(self.preview_dir, session.render_id)
+        entries = await asyncio.to_thread(reader.poll)
+        index = FrameIndex(generation, [entry.path for entry in entries],
+                           complete=reader.finished)
+        # Only a finished render has a final listing worth keeping
+        if index.frames and index.complete and generation == session.render_generation:
+            session.frame_index = index
+        return index
 
     async def _broadcast_frames(self, username: str):
-        """Broadcast frames once (stops after last frame)"""
+        """
+        Broadcast the session's playback range, optionally looping.
+        start_broadcast updates to the range are applied without restarting.
+        """
         session = self.session_manager.get_session(username)
-        if not session or not session.browser_socket:
+        if not session or not session.viewers:
             return
 
+        pacer = None
+        encoder = self._create_delta_encoder(session)
+
         try:
-            frames = sorted(self.preview_dir.glob("frame_*.png"))
+            generation = session.render_generation
+            frames = await self._get_frame_index(session)
             if not frames:
                 return
 
-            # Start from the frame after the last frame that was sent
-            start_frame_index = session.last_frame_index + \
+            playback_version = None
+            first = last = 0
+            # Resume from the frame after the last frame that was sent
+            cursor = session.last_frame_index + \
                 1 if session.last_frame_index is not None else 0
 
-            # Broadcast frames sequentially (no automatic looping)
-            for frame_index in range(start_frame_index, len(frames)):
-                frame = frames[frame_index]
+            while session.should_broadcast:  # Check pause/stop flag
+                if playback_version != session.playback_version:
+                    # New or changed playback: re-range, seek and re-anchor the schedule
+                    playback_version = session.playback_version
+                    playback = session.playback
+                    first, last = playback.bounds(len(frames))
+                    if playback.seek or not first <= cursor <= last:
+                        cursor = first
+                    pacer = BroadcastPacer(playback.fps or session.preview_fps)
+                    session.pacer = pacer
+                    if encoder:
+                        encoder.reset()
+                    slot = 0
+                    stats_due = 0.0
 
-                if not session.should_broadcast:  # Check pause/stop flag
-                    break
+                if cursor > last:
+                    if not session.playback.loop:
+                        break
+                    cursor = first
+                    continue
+
+                frame_index = cursor
+                cursor += session.playback.step
 
                 try:
-                    with open(frame, "rb") as img_file:
-                        img_str = base64.b64encode(img_file.read()).decode()
-                        await session.browser_socket.send_json({
-                            "type": "frame",
-                            "data": img_str,
-                            "frame_index": frame_index,
-                        })
+                    # Load before waiting so disk time is absorbed by the schedule
+                    payload, codec = await self._load_frame(
+                        username, session, generation, frame_index, frames[frame_index])
+                    delta = await asyncio.to_thread(encoder.encode, payload, codec) \
+                        if encoder else None
+                    on_time = await pacer.wait_for_slot(slot)
+                    slot += 1
+                    if playback_version != session.playback_version:
+                        cursor = frame_index  # Playback changed while waiting, re-evaluate
+                        continue
+                    if not on_time:
+                        session.last_frame_index = frame_index  # Skipped, fell behind schedule
+                        continue
+
+                    # Encoded once, queued for every viewer without waiting on any of them
+                    session.fan_out(FramePacket(
+                        frame_index, len(frames), codec, payload, delta))
+                    if encoder:
+                        encoder.commit(delta)
+                    pacer.record_sent()
                     session.last_frame_index = frame_index  # Track progress
                 except Exception as e:
                     self.logger.error(f"Error sending frame: {e}")
                     session.should_broadcast = False
                     return
 
-                await asyncio.sleep(0.033)  # ~30 FPS
+                if slot * pacer.frame_interval >= stats_due:
+                    self._send_broadcast_stats(session, pacer)
+                    stats_due += 1.0
 
-            # Notify client the broadcast finished (only if it completed fully)
-            if session.last_frame_index == len(frames) - 1:
-                await session.browser_socket.send_json({
-                    "type": "broadcast_complete"
-                })
+            # Notify clients the broadcast finished (only if it completed fully)
+            if session.should_broadcast and cursor > last:
+                self._send_broadcast_stats(
+                    session, pacer, "broadcast_complete")
                 # Reset last_frame_index only after the last frame has been sent
                 session.last_frame_index = -1
 
@@ -232,13 +823,204 @@ class WebSocketHandler:
         finally:
             session.should_broadcast = False  # Ensure broadcast stops
 
+    async def _stream_frames(self, username: str, expected_frames: Optional[int] = None):
+        """Push each frame to the browser as soon as Blender has finished writing it"""
+        session = self.session_manager.get_session(username)
+        if not session or not session.viewers:
+            return
+
+        watcher = FrameWatcher(
+            self.preview_dir, session.render_id,
+            poll_interval=settings.PREVIEW_STREAM_POLL_INTERVAL)
+        total_frames = expected_frames or 0
+        generation = session.render_generation
+        streamed = FrameIndex(generation)
+        # Frames arrive at render speed, only counted here, not scheduled
+        pacer = BroadcastPacer(session.preview_fps)
+        session.pacer = pacer
+        encoder = self._create_delta_encoder(session)
+
+        try:
+            async for entry in watcher.watch(session.render_finished.is_set, expected_frames):
+                frame_index = streamed.append(entry.path)
+                payload, codec = await self._load_frame(
+                    username, session, generation, frame_index, entry.path)
+
+                if not session.should_broadcast:
+                    # Keep filling the cache so a later replay needs no I/O
+                    continue
+
+                delta = await asyncio.to_thread(encoder.encode, payload, codec) \
+                    if encoder else None
+                session.fan_out(FramePacket(
+                    frame_index, total_frames, codec, payload, delta))
+                if encoder:
+                    encoder.commit(delta)
+                pacer.record_sent()
+                session.last_frame_index = frame_index
+
+            if generation == session.render_generation:
+                # The stream already saw every frame, replays need no directory scan
+                streamed.complete = True
+                session.frame_index = streamed
+                session.streamed_generation = generation
+
+            if session.should_broadcast:
+                self._send_broadcast_stats(
+                    session, pacer, "broadcast_complete")
+                session.last_frame_index = -1
+
+        except asyncio.CancelledError:
+            self.logger.info(f"Frame stream cancelled for {username}")
+        except Exception as e:
+            self.logger.error(f"Frame stream error: {e}")
+        finally:
+            session.should_broadcast = False
+
+    async def _broadcast_video(self, username: str, expected_frames: Optional[int] = None,
+                               live: bool = False):
+        """
+        Encode the preview into a fragmented MP4 stream for Media Source Extensions.
+        Live streams feed frames as Blender writes them; replays feed the playback
+        range at the playback fps, looping by extending the stream.
+        """
+        session = self.session_manager.get_session(username)
+        if not session or not session.viewers:
+            return
+
+        generation = session.render_generation
+        playback = session.playback
+        fps = playback.fps or session.preview_fps
+        pacer = BroadcastPacer(fps)
+        session.pacer = pacer
+        forward_task = None
+        completed = False
+
+        try:
+            session.broadcast_json({
+                "type": "video_stream",
+                "mime_type": FMP4_MIME_TYPE,
+                "fps": fps,
+                "total_frames": expected_frames
+            })
+
+            async with ffmpeg_pool.encoder(fps) as encoder:
+                forward_task = asyncio.create_task(
+                    self._forward_segments(session, encoder))
+
+                if live:
+                    completed = await self._feed_rendered_frames(
+                        username, session, generation, encoder, pacer, expected_frames)
+                else:
+                    completed = await self._feed_indexed_frames(
+                        username, session, generation, encoder, pacer)
+
+                await encoder.finish()
+                await forward_task
+
+            if completed and session.should_broadcast:
+                self._send_broadcast_stats(session, pacer, "broadcast_complete")
+                session.last_frame_index = -1
+
+        except asyncio.CancelledError:
+            self.logger.info(f"Video stream cancelled for {username}")
+        except Exception as e:
+            self.logger.error(f"Video stream error: {e}")
+            session.broadcast_json({
+                "status": "ERROR",
+                "message": f"Video stream failed: {e}"
+            })
+        finally:
+            if forward_task and not forward_task.done():
+                forward_task.cancel()
+            session.should_broadcast = False
+
+    async def _forward_segments(self, session, encoder) -> None:
+        """Fan out the encoder's segments, remembering the init segment for late viewers"""
+        init = None
+        async for packet in encoder.segments():
+            if packet.is_init:
+                init = packet
+            if init is not None:
+                session.fan_out_segment(packet, init)
+
+    async def _feed_rendered_frames(self, username: str, session, generation: int,
+                                    encoder, pacer: BroadcastPacer,
+                                    expected_frames: Optional[int]) -> bool:
+        watcher = FrameWatcher(
+            self.preview_dir, session.render_id,
+            poll_interval=settings.PREVIEW_STREAM_POLL_INTERVAL)
+        streamed = FrameIndex(generation)
+
+        async for entry in watcher.watch(session.render_finished.is_set, expected_frames):
+            frame_index = streamed.append(entry.path)
+            payload, _ = await self._load_frame(
+                username, session, generation, frame_index, entry.path, FrameFormat.PNG)
+            if not session.should_broadcast:
+                return False
+            await encoder.write_frame(payload)
+            pacer.record_sent()
+            session.last_frame_index = frame_index
+
+        if generation == session.render_generation:
+            streamed.complete = True
+            session.frame_index = streamed
+            session.streamed_generation = generation
+        return True
+
+    async def _feed_indexed_frames(self, username: str, session, generation: int,
+                                   encoder, pacer: BroadcastPacer) -> bool:
+        frames = await self._get_frame_index(session)
+        if not frames:
+            return False
+
+        playback_version = None
+        first = last = cursor = 0
+        slot = 0
+        while session.should_broadcast:
+            if playback_version != session.playback_version:
+                # Range, step, loop and seeks apply to the running stream; the
+                # stream's fps is fixed by its encoder, so an fps change is not
+                playback_version = session.playback_version
+                first, last = session.playback.bounds(len(frames))
+                if session.playback.seek or not first <= cursor <= last:
+                    cursor = first
+
+            if cursor > last:
+                if not session.playback.loop:
+                    return True
+                cursor = first
+                continue
+
+            frame_index = cursor
+            cursor += session.playback.step
+            payload, _ = await self._load_frame(
+                username, session, generation, frame_index, frames[frame_index],
+                FrameFormat.PNG)
+            # Real time pacing keeps a looping stream from racing ahead of playback
+            await pacer.wait_until_due(slot)
+            slot += 1
+            if not session.should_broadcast:
+                return False
+            await encoder.write_frame(payload)
+            pacer.record_sent()
+            session.last_frame_index = frame_index
+        return False
+
     async def _handle_get_template_controls(self, username: str, data: Dict[str, Any], client_type: str):
         """Handle template controls request with proper message tracking"""
+        # Ingested templates are answered from the database, without Blender
+        if data.get("template_id") is not None and data.get("since_version") is None:
+            if await self._send_ingested_template_controls(username, data):
+                return
+
         try:
             # Generate and track message ID
             message_id = str(uuid.uuid4())
             print(f"Generated new message_id: {message_id}")
-            self.session_manager.add_pending_request(username, message_id)
+            # A delta is computed against the requester's since_version, so only it gets the reply
+            self.session_manager.add_pending_request(
+                username, message_id, self.websocket if client_type == "browser" else None)
 
             # Get session and validate connection
             session = self.session_manager.get_session(username)
@@ -251,6 +1033,10 @@ class WebSocketHandler:
                 "command": "rescan_template",
                 "message_id": message_id
             }
+            # A browser holding controls asks only for what changed since
+            if data.get("since_version") is not None:
+                command["since_version"] = data.get("since_version")
+                command["epoch"] = data.get("epoch")
             await session.blender_socket.send_json(command)
 
             # Log successful request
@@ -265,6 +1051,37 @@ class WebSocketHandler:
                 self.session_manager.remove_pending_request(message_id)
             await self._send_error(username, f"Failed to process template controls request: {str(e)}")
 
+    async def _send_ingested_template_controls(self, username: str, data: Dict[str, Any]) -> bool:
+        """Send the stored controls of an ingested template; False if there are none"""
+        try:
+            metadata = await TemplateIngestionService.get_template_metadata(
+                get_db(), data.get("template_id"))
+        except Exception as e:
+            self.logger.warning(
+                f"Could not load template {data.get('template_id')} controls: {str(e)}")
+            return False
+
+        session = self.session_manager.get_session(username)
+        if not metadata or not session:
+            return False
+
+        self._reply(session, {
+            "command": "template_controls",
+            "status": "success",
+            "message_id": data.get("message_id") or str(uuid.uuid4()),
+            "full": True,
+            "source": "template",
+            "controllables": metadata.get("controllables") or {},
+            "template": {
+                field: metadata.get(field) for field in (
+                    "frame_start", "frame_end", "fps", "resolution_x", "resolution_y",
+                    "render_engine", "estimated_frame_cost")
+            }
+        })
+        self.logger.info(
+            f"Sent stored controls of template {data.get('template_id')} to {username}")
+        return True
+
     async def _handle_template_controls_response(self, username: str, data: Dict[str, Any], client_type: str):
         """Handle template controls response"""
         self.logger.debug(
@@ -329,27 +1146,40 @@ class WebSocketHandler:
                 self.logger.error(f"No session found for {request_username}")
                 return
 
-            if not session.browser_socket:
-                self.logger.error(f"No browser socket for {request_username}")
-                return
-
-            # Validate controllables data
-            if not isinstance(controllables, dict):
-                self.logger.error(
-                    f"Invalid controllables format: {type(controllables)}")
-                controllables = {}
-
             # Prepare and send the response
             response = {
                 "command": "template_controls",
-                "controllables": controllables,
                 "status": "success",
-                "message_id": message_id
+                "message_id": message_id,
+                "version": inner_data.get("version"),
+                "epoch": inner_data.get("epoch"),
+                "full": inner_data.get("full", True)
             }
+            if response["full"]:
+                # Validate controllables data
+                if not isinstance(controllables, dict):
+                    self.logger.error(
+                        f"Invalid controllables format: {type(controllables)}")
+                    controllables = {}
+                response["controllables"] = controllables
+            else:
+                for field in ("added", "changed", "removed"):
+                    response[field] = inner_data.get(field) or {}
+
+            requester = session.get_viewer(session.pending_viewers.get(message_id))
+            if not requester and not response["full"]:
+                # A delta only applies on top of the version its requester holds
+                self.logger.info(
+                    f"Requester of {message_id} disconnected, dropping its template controls delta")
+                self.session_manager.remove_pending_request(message_id)
+                return
 
             self.logger.debug(
                 f"Sending template controls to {request_username}: {response}")
-            await session.browser_socket.send_json(response)
+            if requester:
+                requester.offer_message(response)
+            else:
+                self._reply(session, response)
             self.logger.info(
                 f"Successfully sent template controls to {request_username}")
 
@@ -360,12 +1190,18 @@ class WebSocketHandler:
             self.logger.error(
                 f"Error in template controls response handling: {str(e)}")
             # Attempt to send error response if possible
-            if 'session' in locals() and session and session.browser_socket:
-                await session.browser_socket.send_json({
+            if 'session' in locals() and session:
+                error = {
                     "command": "template_controls",
                     "status": "error",
                     "message": str(e)
-                })
+                }
+                requester = session.get_viewer(session.pending_viewers.get(message_id)) \
+                    if 'message_id' in locals() else None
+                if requester:
+                    requester.offer_message(error)
+                else:
+                    self._reply(session, error)
             # Don't clean up pending request on error to allow for retries
             if 'message_id' in locals():
                 self.logger.debug(
@@ -385,10 +1221,10 @@ class WebSocketHandler:
         })
 
     async def _send_error(self, username: str, message: str):
-        """Send error message to browser client"""
+        """Send an error message to the browser that made the request"""
         session = self.session_manager.get_session(username)
-        if session and session.browser_socket:
-            await session.browser_socket.send_json({
+        if session:
+            self._reply(session, {
                 "status": "ERROR",
                 "message": message
             })
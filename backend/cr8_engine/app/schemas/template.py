@@ -26,6 +26,15 @@ class TemplateUpdate(BaseModel):
 
 class TemplateRead(TemplateBase):
     id: int
+    ingestion_status: Optional[str] = None
+    controllables: Optional[Dict[str, Any]] = None
+    frame_start: Optional[int] = None
+    frame_end: Optional[int] = None
+    fps: Optional[float] = None
+    resolution_x: Optional[int] = None
+    resolution_y: Optional[int] = None
+    render_engine: Optional[str] = None
+    estimated_frame_cost: Optional[float] = None
     creator: "UserRead"
     project_templates: List[int] = []
 
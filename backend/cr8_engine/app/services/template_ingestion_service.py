@@ -0,0 +1,166 @@
+# app/services/template_ingestion_service.py
+import asyncio
+import io
+import json
+import logging
+import posixpath
+import shlex
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+from supabase import Client
+from app.core.config import settings
+from app.services.blender_service import BlenderService
+
+logger = logging.getLogger(__name__)
+
+# Printed by the addon's template_wizard.ingest_template operator
+INGEST_MARKER = "CR8_TEMPLATE_METADATA"
+
+TEMPLATE_METADATA_FIELDS = (
+    "controllables", "frame_start", "frame_end", "fps", "resolution_x",
+    "resolution_y", "render_engine", "estimated_frame_cost",
+)
+
+
+class IngestionStatus:
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class TemplateIngestionService:
+    """
+    Extracts what a template offers once, when it is uploaded.
+
+    The blend file is copied to the Blender host and opened by a headless
+    Blender that prints its controllables, frame range, fps, resolution
+    and an estimated render cost per frame. The result is stored on the
+    template row, so sessions learn their controls from the database
+    instead of a round trip to their own Blender instance.
+    """
+
+    _slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def _job_slots(cls) -> asyncio.Semaphore:
+        # Created lazily, inside the running event loop
+        if cls._slots is None:
+            cls._slots = asyncio.Semaphore(max(settings.TEMPLATE_INGEST_MAX_JOBS, 1))
+        return cls._slots
+
+    @staticmethod
+    def parse_metadata(output: str) -> Dict[str, Any]:
+        """Find the metadata line in Blender's output"""
+        for line in reversed(output.splitlines()):
+            if line.startswith(INGEST_MARKER):
+                return json.loads(line[len(INGEST_MARKER):])
+        raise ValueError("Blender did not report template metadata")
+
+    @staticmethod
+    def _read_output(channel, timeout: float) -> str:
+        """Read a command's output until it ends, giving up after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Blender did not finish within {timeout:g}s")
+            channel.settimeout(remaining)
+            try:
+                chunk = channel.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                return b"".join(chunks).decode(errors="replace")
+            chunks.append(chunk)
+
+    @staticmethod
+    def _run_headless(blend_content: bytes, filename: str) -> Dict[str, Any]:
+        """Copy the blend file to the Blender host, extract its metadata and clean up"""
+        client = BlenderService.create_ssh_client()
+        remote_dir = posixpath.join(
+            settings.BLENDER_REMOTE_DIRECTORY, "ingest", uuid.uuid4().hex)
+        remote_path = posixpath.join(remote_dir, posixpath.basename(filename) or "template.blend")
+        try:
+            client.exec_command(f"mkdir -p {shlex.quote(remote_dir)}")[1].channel.recv_exit_status()
+            sftp = client.open_sftp()
+            try:
+                sftp.putfo(io.BytesIO(blend_content), remote_path)
+            finally:
+                sftp.close()
+
+            command = (
+                f"blender -b {shlex.quote(remote_path)} --python-expr "
+                f"\"import bpy; bpy.ops.template_wizard.ingest_template("
+                f"probe_percentage={int(settings.TEMPLATE_INGEST_PROBE_PERCENTAGE)})\""
+            )
+            channel = client.get_transport().open_session()
+            try:
+                # One stream, so a full stderr window can never stall Blender
+                channel.set_combine_stderr(True)
+                channel.exec_command(command)
+                output = TemplateIngestionService._read_output(
+                    channel, settings.TEMPLATE_INGEST_TIMEOUT)
+                if channel.recv_exit_status() != 0:
+                    raise RuntimeError(
+                        f"Blender exited with an error: {output.strip()[-2000:]}")
+            finally:
+                channel.close()
+            return TemplateIngestionService.parse_metadata(output)
+        finally:
+            try:
+                client.exec_command(f"rm -rf {shlex.quote(remote_dir)}")[1].channel.recv_exit_status()
+            finally:
+                client.close()
+
+    @staticmethod
+    async def extract_metadata(blend_content: bytes, filename: str) -> Dict[str, Any]:
+        """Run the headless extraction without blocking the event loop"""
+        async with TemplateIngestionService._job_slots():
+            metadata = await asyncio.to_thread(
+                TemplateIngestionService._run_headless, blend_content, filename)
+        return {field: metadata.get(field) for field in TEMPLATE_METADATA_FIELDS}
+
+    @staticmethod
+    async def ingest(db: Client, template_id: int, blend_content: bytes, filename: str) -> bool:
+        """Extract a template's metadata and store it on its row"""
+        def update(values: Dict[str, Any]):
+            return db.table("template").update(values).eq("id", template_id).execute()
+
+        try:
+            await asyncio.to_thread(update, {"ingestion_status": IngestionStatus.PROCESSING})
+            metadata = await TemplateIngestionService.extract_metadata(blend_content, filename)
+            await asyncio.to_thread(update, {
+                **metadata,
+                "ingestion_status": IngestionStatus.READY,
+                "ingested_at": datetime.utcnow().isoformat(),
+            })
+            logger.info(
+                f"Ingested template {template_id}: frames {metadata['frame_start']}-"
+                f"{metadata['frame_end']}, estimated {metadata['estimated_frame_cost']}s per frame")
+            return True
+        except Exception as e:
+            logger.error(f"Ingesting template {template_id} failed: {str(e)}")
+            try:
+                await asyncio.to_thread(update, {"ingestion_status": IngestionStatus.FAILED})
+            except Exception as update_error:
+                logger.error(
+                    f"Could not mark template {template_id} as failed: {str(update_error)}")
+            return False
+
+    @staticmethod
+    async def get_template_metadata(db: Client, template_id: int) -> Optional[Dict[str, Any]]:
+        """Stored metadata of an ingested template, None until ingestion succeeded"""
+        def select():
+            return db.table("template").select(
+                ", ".join(("ingestion_status",) + TEMPLATE_METADATA_FIELDS)
+            ).eq("id", template_id).execute()
+
+        result = await asyncio.to_thread(select)
+        if not result.data or result.data[0].get("ingestion_status") != IngestionStatus.READY:
+            return None
+        return result.data[0]
@@ -0,0 +1,360 @@
+# app/services/video_export_service.py
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class VideoPreset:
+    H264_WEB = "h264_web"
+    VP9 = "vp9"
+    MASTER = "master"
+
+    EVEN_DIMENSIONS = ["-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2"]
+
+    # extension, ffmpeg output arguments
+    SETTINGS = {
+        H264_WEB: ("mp4", EVEN_DIMENSIONS + [
+            "-c:v", "libx264", "-preset", "medium", "-crf", "23",
+            "-profile:v", "high", "-pix_fmt", "yuv420p", "-movflags", "+faststart"]),
+        VP9: ("webm", EVEN_DIMENSIONS + [
+            "-c:v", "libvpx-vp9", "-crf", "32", "-b:v", "0",
+            "-deadline", "good", "-cpu-used", "2", "-row-mt", "1", "-pix_fmt", "yuv420p"]),
+        MASTER: ("mov", [
+            "-c:v", "prores_ks", "-profile:v", "3", "-pix_fmt", "yuv422p10le"]),
+    }
+
+    DEFAULT = [H264_WEB]
+
+    @classmethod
+    def validate(cls, presets: Optional[Sequence[str]]) -> List[str]:
+        presets = list(dict.fromkeys(presets or cls.DEFAULT))
+        unknown = [preset for preset in presets if preset not in cls.SETTINGS]
+        if unknown:
+            raise ValueError(f"Unknown video presets: {', '.join(unknown)}")
+        return presets
+
+
+class VideoExportStatus:
+    QUEUED = "queued"
+    ENCODING = "encoding"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class VideoExportJob:
+    def __init__(self, frames_hash: str, frame_paths: List[Path],
+                 fps: float, presets: List[str]):
+        self.job_id = str(uuid.uuid4())
+        # Every user that asked for this export, each told once it is done
+        self.owners: Set[str] = set()
+        self.callbacks: List[Callable[["VideoExportJob"], None]] = []
+        self.frames_hash = frames_hash
+        self.frame_paths = frame_paths
+        self.fps = fps
+        self.presets = presets
+        self.status = VideoExportStatus.QUEUED
+        self.frames_encoded = 0
+        self.outputs: Dict[str, str] = {}
+        self.cached = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # preset -> a video of these frames already encoded with that preset
+        self.reuse: Dict[str, Path] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.status in (VideoExportStatus.COMPLETED, VideoExportStatus.FAILED)
+
+    def add_owner(self, username: str, on_done=None) -> None:
+        if username in self.owners:
+            return
+        self.owners.add(username)
+        if on_done:
+            self.callbacks.append(on_done)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "presets": self.presets,
+            "frames_encoded": self.frames_encoded,
+            "total_frames": len(self.frame_paths),
+            "outputs": self.outputs,
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+
+class VideoExportService:
+    """
+    Encodes preview frame sequences into videos on the server.
+
+    At most max_workers jobs encode at once. A job splits its frames into
+    contiguous segments, up to one per segment worker, and encodes them in
+    parallel ffmpeg processes that each decode their frames once and write
+    every requested preset. Every segment starts on a keyframe, so the
+    segments of a preset are joined with the concat demuxer without
+    re-encoding. Results are stored per frame-set hash and preset under the
+    export directory, so exporting the same frames again is answered from
+    disk, across users.
+    """
+
+    def __init__(self, export_dir: Path, max_workers: int, ffmpeg: str = "ffmpeg",
+                 max_finished_jobs: int = 200, segment_workers: int = 0,
+                 min_segment_frames: int = 48):
+        self.export_dir = export_dir
+        self.ffmpeg = ffmpeg
+        self.max_finished_jobs = max_finished_jobs
+        self.segment_workers = segment_workers or os.cpu_count() or 1
+        self.min_segment_frames = max(min_segment_frames, 1)
+        self._slots = asyncio.Semaphore(max(max_workers, 1))
+        self.jobs: Dict[str, VideoExportJob] = {}
+
+    @staticmethod
+    def frames_hash(frame_checksums: Sequence[str], fps: float) -> str:
+        """Identity of a frame set: the ordered frame contents and the frame rate"""
+        digest = hashlib.sha256(f"{fps:g}".encode())
+        for checksum in frame_checksums:
+            digest.update(checksum.encode())
+        return digest.hexdigest()
+
+    def output_path(self, frames_hash: str, preset: str) -> Path:
+        extension = VideoPreset.SETTINGS[preset][0]
+        return self.export_dir / frames_hash[:2] / frames_hash / f"{preset}.{extension}"
+
+    def relative_output(self, path: Path) -> str:
+        return str(path.relative_to(self.export_dir))
+
+    def submit(self, username: str, frame_paths: List[Path], frame_checksums: Sequence[str],
+               fps: float, presets: Optional[Sequence[str]] = None,
+               on_done=None, reuse: Optional[Dict[str, Path]] = None) -> VideoExportJob:
+        """
+        Queue an export, reusing cached outputs or an identical running job;
+        a reused job reports to every user that asked for it. reuse maps a
+        preset to a video of the same frames already encoded with it, which
+        is published instead of encoding that preset again.
+        """
+        presets = VideoPreset.validate(presets)
+        frames_hash = self.frames_hash(frame_checksums, fps)
+
+        for job in self.jobs.values():
+            if job.frames_hash == frames_hash and job.presets == presets and not job.done:
+                job.add_owner(username, on_done)
+                return job
+
+        job = VideoExportJob(frames_hash, frame_paths, fps, presets)
+        job.add_owner(username, on_done)
+        job.reuse = {preset: Path(path) for preset, path in (reuse or {}).items()
+                     if preset in presets}
+        self.jobs[job.job_id] = job
+        self._prune()
+
+        missing = [preset for preset in presets
+                   if not self.output_path(frames_hash, preset).exists()]
+        if not missing:
+            job.cached = True
+            job.frames_encoded = len(frame_paths)
+            self._complete(job)
+            return job
+
+        job.task = asyncio.create_task(self._run(job, missing))
+        return job
+
+    def get(self, job_id: str) -> Optional[VideoExportJob]:
+        return self.jobs.get(job_id)
+
+    def _complete(self, job: VideoExportJob) -> None:
+        job.outputs = {
+            preset: self.relative_output(self.output_path(job.frames_hash, preset))
+            for preset in job.presets
+        }
+        job.status = VideoExportStatus.COMPLETED
+        job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = sorted((job for job in self.jobs.values() if job.done),
+                          key=lambda job: job.finished_at)
+        for job in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job.job_id]
+
+    async def _run(self, job: VideoExportJob, presets: List[str]) -> None:
+        try:
+            encode = []
+            for preset in presets:
+                if not (preset in job.reuse and await asyncio.to_thread(self._reuse, job, preset)):
+                    encode.append(preset)
+
+            if encode:
+                async with self._slots:
+                    job.status = VideoExportStatus.ENCODING
+                    await self._encode(job, encode)
+            else:
+                job.frames_encoded = len(job.frame_paths)
+            self._complete(job)
+            logger.info(f"Video export {job.job_id} completed: {', '.join(presets)}")
+        except asyncio.CancelledError:
+            job.status = VideoExportStatus.FAILED
+            job.error = "Cancelled"
+            job.finished_at = time.time()
+            raise
+        except Exception as e:
+            logger.error(f"Video export {job.job_id} failed: {e}")
+            job.status = VideoExportStatus.FAILED
+            job.error = str(e)
+            job.finished_at = time.time()
+        finally:
+            if job.done:
+                for on_done in job.callbacks:
+                    on_done(job)
+
+    def _reuse(self, job: VideoExportJob, preset: str) -> bool:
+        """Publish an already encoded video as a preset's output; False to encode it instead"""
+        source = job.reuse[preset]
+        output = self.output_path(job.frames_hash, preset)
+        temp_path = output.with_name(f"{output.stem}.{job.job_id}.part{output.suffix}")
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, output)
+        except OSError as e:
+            temp_path.unlink(missing_ok=True)
+            logger.warning(f"Could not reuse {source} as {preset}, encoding it: {e}")
+            return False
+        logger.info(f"Video export {job.job_id} reused {source.name} as {preset}")
+        return True
+
+    def segments(self, frame_paths: List[Path]) -> List[List[Path]]:
+        """Split the frames into at most one segment per segment worker"""
+        count = max(1, min(self.segment_workers,
+                           math.ceil(len(frame_paths) / self.min_segment_frames)))
+        size = math.ceil(len(frame_paths) / count)
+        return [frame_paths[start:start + size] for start in range(0, len(frame_paths), size)]
+
+    async def _encode(self, job: VideoExportJob, presets: List[str]) -> None:
+        outputs = {preset: self.output_path(job.frames_hash, preset) for preset in presets}
+        temp_outputs = {
+            preset: path.with_name(f"{path.stem}.{job.job_id}.part{path.suffix}")
+            for preset, path in outputs.items()
+        }
+        output_dir = next(iter(outputs.values())).parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        segments = self.segments(job.frame_paths)
+        threads = max(1, self.segment_workers // len(segments))
+        work_dir = output_dir / f"{job.job_id}.segments"
+        if len(segments) == 1:
+            parts = [temp_outputs]
+        else:
+            work_dir.mkdir()
+            parts = [
+                {preset: work_dir / f"{preset}_{index:04d}{path.suffix}"
+                 for preset, path in outputs.items()}
+                for index in range(len(segments))
+            ]
+
+        try:
+            tasks = [
+                asyncio.create_task(self._encode_segment(job, frames, segment_outputs, threads))
+                for frames, segment_outputs in zip(segments, parts)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            if len(segments) > 1:
+                for preset, temp_path in temp_outputs.items():
+                    await self._concat(
+                        [segment_outputs[preset] for segment_outputs in parts],
+                        temp_path, work_dir)
+
+            # Published only once complete, a half written file is never served
+            for preset, temp_path in temp_outputs.items():
+                os.replace(temp_path, outputs[preset])
+        except BaseException:
+            for temp_path in temp_outputs.values():
+                temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            if work_dir.exists():
+                await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+    async def _encode_segment(self, job: VideoExportJob, frames: List[Path],
+                              outputs: Dict[str, Path], threads: int) -> None:
+        """Encode one run of frames into every preset with a single ffmpeg process"""
+        command = [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "image2pipe", "-c:v", "png", "-framerate", f"{job.fps:g}", "-i", "pipe:0",
+        ]
+        for preset, path in outputs.items():
+            command += VideoPreset.SETTINGS[preset][1] + ["-threads", str(threads), str(path)]
+
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stderr_task = asyncio.create_task(process.stderr.read())
+            try:
+                for path in frames:
+                    process.stdin.write(await asyncio.to_thread(path.read_bytes))
+                    await process.stdin.drain()
+                    job.frames_encoded += 1
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg failed, its exit status below says why
+            finally:
+                process.stdin.close()
+
+            returncode = await process.wait()
+            error = await stderr_task
+            if returncode != 0:
+                raise RuntimeError(error.decode(errors="replace") or f"ffmpeg exited with {returncode}")
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+    async def _concat(self, parts: List[Path], output: Path, work_dir: Path) -> None:
+        """Join the segments of one preset without re-encoding"""
+        list_path = work_dir / f"{output.stem}.txt"
+        list_path.write_text("".join(f"file '{part}'\n" for part in parts))
+        command = [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy",
+        ]
+        if output.suffix in (".mp4", ".mov"):
+            command += ["-movflags", "+faststart"]
+        process = await asyncio.create_subprocess_exec(
+            *command, str(output), stderr=asyncio.subprocess.PIPE)
+        _, error = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"Joining segments failed: {error.decode(errors='replace')}")
+
+    def shutdown(self) -> None:
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+
+
+# Shared by every session on this server
+video_export_service = VideoExportService(
+    Path(settings.VIDEO_EXPORT_DIRECTORY or Path(settings.BLENDER_RENDER_PREVIEW_DIRECTORY) / "exports"),
+    settings.VIDEO_EXPORT_WORKERS,
+    settings.PREVIEW_FFMPEG_BINARY,
+    segment_workers=settings.VIDEO_EXPORT_SEGMENT_WORKERS,
+    min_segment_frames=settings.VIDEO_EXPORT_MIN_SEGMENT_FRAMES,
+)
@@ -14,6 +14,9 @@ from app.core.config import settings
 from app.api.v1.endpoints import users, projects, assets, templates, moodboards
 from app.realtime_engine.websockets.session_manager import SessionManager
 from app.realtime_engine.websockets.websocket_handler import WebSocketHandler
+from app.realtime_engine.websockets.message_codec import receive_message
+from app.realtime_engine.preview.frame_transcoder import frame_transcoder
+from app.services.video_export_service import video_export_service
 from app.db.session import get_db
 from app.db.base import Base
 
@@ -29,6 +32,10 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    # Shutdown events
+    frame_transcoder.shutdown()
+    video_export_service.shutdown()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="CG Content Platform API",
@@ -165,16 +172,17 @@ async def websocket_endpoint(websocket: WebSocket, username: str, client_type: s
             await session_manager.register_blender(username, websocket)
             await websocket.send_json({"status": "connected", "message": "Blender registered"})
 
-        websocket_handler = WebSocketHandler(session_manager, username)
+        websocket_handler = WebSocketHandler(
+            session_manager, username, websocket)
 
         try:
             while True:
-                data = await websocket.receive_json()
+                data = await receive_message(websocket)
                 # Process message with the handler
                 await websocket_handler.handle_message(username, data, client_type)
 
         except WebSocketDisconnect:
-            await session_manager.handle_disconnect(username, client_type)
+            await session_manager.handle_disconnect(username, client_type, websocket)
 
     except Exception as e:
         await websocket.close()
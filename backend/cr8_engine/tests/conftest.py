@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+from PIL import Image
+
+# Settings are read once at import, the tests need none of the real services
+for name, value in {
+    "DATABASE_URL": "postgresql://test", "SUPABASE_ANON_KEY": "test",
+    "DB_user": "test", "DB_password": "test", "DB_host": "localhost", "DB_port": "5432",
+    "DB_name": "test", "WS_HOST": "localhost", "WS_PORT": "8000",
+    "MINIO_ENDPOINT": "localhost", "MINIO_ACCESS_KEY": "test", "MINIO_SECRET_KEY": "test",
+    "MINIO_BUCKET_NAME": "test", "SSH_PRIVATE_KEY": "test", "SSH_USERNAME": "test",
+    "SSH_PORT": "22", "SSH_LOCAL_IP": "localhost", "BLENDER_REMOTE_DIRECTORY": "/tmp",
+}.items():
+    os.environ.setdefault(name, value)
+os.environ.setdefault("BLENDER_RENDER_PREVIEW_DIRECTORY", tempfile.mkdtemp(prefix="cr8-previews-"))
+os.environ.setdefault("PREVIEW_RENDER_DEBOUNCE", "0")
+
+
+class FakeWebSocket:
+    """Records what the server sends to one client"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_text(self, message):
+        self.sent.append(message)
+
+    async def send_bytes(self, message):
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+    def messages(self, **fields):
+        """The JSON messages sent so far that have all the given field values"""
+        return [message for message in self.sent if isinstance(message, dict)
+                and all(message.get(key) == value for key, value in fields.items())]
+
+
+async def drain():
+    """Let the viewers' send tasks flush their queues"""
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+class ManifestWriter:
+    """Writes preview frames and their manifest the way the Blender addon does"""
+
+    def __init__(self, preview_dir: Path, generation: str):
+        self.preview_dir = Path(preview_dir)
+        self.path = self.preview_dir / "manifest.jsonl"
+        self.generation = generation
+        self.frames = 0
+
+    def _write(self, record, mode="a"):
+        with open(self.path, mode) as f:
+            f.write(json.dumps({"generation": self.generation, **record}) + "\n")
+
+    def begin(self, frame_count: int):
+        self._write({"type": "begin", "frame_count": frame_count}, mode="w")
+
+    def frame(self, payload: bytes):
+        name = f"frame_{self.frames + 1:04d}.png"
+        (self.preview_dir / name).write_bytes(payload)
+        self._write({"type": "frame", "frame": self.frames + 1, "index": self.frames,
+                     "file": name, "size": len(payload),
+                     "sha1": hashlib.sha1(payload).hexdigest(), "render_ms": 1.0})
+        self.frames += 1
+
+    def end(self, status: str = "completed"):
+        self._write({"type": "end", "status": status, "frame_count": self.frames})
+
+
+def png(shade: int, size=(16, 16)) -> bytes:
+    """A small solid PNG frame"""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (shade, shade, shade)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+ADDON_DIR = Path(__file__).resolve().parents[2] / "blender_cr8tive_engine"
+
+
+def _install_bpy():
+    """The parts of Blender's bpy module the addon touches at import time"""
+    if "bpy" in sys.modules:
+        return
+    handlers = types.ModuleType("bpy.app.handlers")
+    handlers.persistent = lambda function: function
+    for name in ("depsgraph_update_post", "load_post", "undo_post", "redo_post"):
+        setattr(handlers, name, [])
+    app = types.ModuleType("bpy.app")
+    app.handlers = handlers
+    bpy = types.ModuleType("bpy")
+    bpy.app = app
+    bpy.types = types.SimpleNamespace(
+        Operator=object, Object=type("Object", (), {}), Material=type("Material", (), {}),
+        Light=type("Light", (), {}), Camera=type("Camera", (), {}))
+    bpy.props = types.SimpleNamespace(IntProperty=lambda **options: None)
+    bpy.data = types.SimpleNamespace(filepath="")
+    sys.modules.update({"bpy": bpy, "bpy.app": app, "bpy.app.handlers": handlers})
+
+
+def load_addon_module(name: str):
+    """Import a module of the Blender addon without running the addon's register code"""
+    if "blender_cr8tive_engine" not in sys.modules:
+        _install_bpy()
+        package = types.ModuleType("blender_cr8tive_engine")
+        package.__path__ = [str(ADDON_DIR)]
+        sys.modules["blender_cr8tive_engine"] = package
+    return importlib.import_module(f"blender_cr8tive_engine.{name}")
@@ -0,0 +1,73 @@
+import asyncio
+
+from app.realtime_engine.websockets.session_manager import Session, SessionManager, SessionState
+from app.realtime_engine.websockets.websocket_handler import WebSocketHandler
+from conftest import FakeWebSocket, ManifestWriter, drain, png
+
+
+def make_session():
+    manager = SessionManager()
+    browser = FakeWebSocket("browser")
+    session = Session("user", browser_socket=browser)
+    session.state = SessionState.CONNECTED
+    session.blender_socket = FakeWebSocket("blender")
+    manager.sessions["user"] = session
+    return manager, session, browser
+
+
+def frames_sent(websocket):
+    return [message for message in websocket.sent if not isinstance(message, dict)]
+
+
+async def stream_render(manager, session, browser, frame_count):
+    """Request a streamed preview and play Blender's part until start_broadcast"""
+    handler = WebSocketHandler(manager, "user", browser)
+    blender = WebSocketHandler(manager, "user", session.blender_socket)
+    await handler.handle_message(
+        "user", {"command": "start_preview_rendering", "stream": True, "params": {}}, "browser")
+    await drain()
+    render_id = session.blender_socket.messages(command="start_preview_rendering")[-1]["render_id"]
+
+    manifest = ManifestWriter(handler.preview_dir, render_id)
+    manifest.begin(frame_count)
+    await blender.handle_message(
+        "user", {"command": "preview_render_started",
+                 "data": {"frame_count": frame_count, "fps": 60}}, "blender")
+    for shade in range(frame_count):
+        manifest.frame(png(shade * 20))
+    # The addon ends the manifest before it sends start_broadcast
+    manifest.end()
+    return blender
+
+
+def test_finished_stream_is_not_replayed_by_start_broadcast():
+    async def run():
+        manager, session, browser = make_session()
+        blender = await stream_render(manager, session, browser, 3)
+        await asyncio.wait_for(session.broadcast_task, 5)
+        await drain()
+        assert len(frames_sent(browser)) == 3
+
+        await blender.handle_message(
+            "user", {"command": "start_broadcast", "data": {"fps": 60}}, "blender")
+        await asyncio.sleep(0.3)
+        await drain()
+
+        assert len(frames_sent(browser)) == 3
+        assert len(browser.messages(type="broadcast_complete")) == 1
+
+    asyncio.run(run())
+
+
+def test_start_broadcast_lets_a_running_stream_finish():
+    async def run():
+        manager, session, browser = make_session()
+        blender = await stream_render(manager, session, browser, 3)
+        await blender.handle_message(
+            "user", {"command": "start_broadcast", "data": {"fps": 60}}, "blender")
+        await asyncio.wait_for(session.broadcast_task, 5)
+        await drain()
+
+        assert len(frames_sent(browser)) == 3
+
+    asyncio.run(run())
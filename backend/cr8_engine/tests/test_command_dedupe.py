@@ -0,0 +1,51 @@
+from conftest import load_addon_module
+
+CommandDedupeStore = load_addon_module("command_dedupe").CommandDedupeStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_processed_commands_are_seen_until_they_expire():
+    clock = Clock()
+    store = CommandDedupeStore(ttl=10, capacity=100, clock=clock)
+    key = ("update_light", "message-1")
+
+    assert not store.seen(key)
+    store.add(key)
+    clock.now = 9
+    assert store.seen(key)
+    # A hit refreshes the entry
+    clock.now = 18
+    assert store.seen(key)
+
+    clock.now = 29
+    assert not store.seen(key)
+    assert len(store) == 0
+    assert store.stats()["expired"] == 1
+    assert (store.hits, store.misses) == (2, 2)
+
+
+def test_least_recently_seen_commands_are_evicted_past_the_capacity():
+    store = CommandDedupeStore(ttl=60, capacity=2, clock=Clock())
+    store.add(("update_light", "a"))
+    store.add(("update_light", "b"))
+    assert store.seen(("update_light", "a"))
+
+    store.add(("update_light", "c"))
+
+    assert store.seen(("update_light", "a"))
+    assert not store.seen(("update_light", "b"))
+    assert store.seen(("update_light", "c"))
+    assert store.stats()["evicted"] == 1
+
+
+def test_same_message_id_of_another_command_is_not_a_duplicate():
+    store = CommandDedupeStore(ttl=60, capacity=10, clock=Clock())
+    store.add(("update_light", "a"))
+    assert not store.seen(("update_material", "a"))
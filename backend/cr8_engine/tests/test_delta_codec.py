@@ -0,0 +1,100 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.realtime_engine.preview.delta_codec import DELTA_COUNT, DELTA_RECT, DeltaEncoder, DeltaKind
+from app.realtime_engine.preview.frame_protocol import FrameCodec
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, "RGBA").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def solid(width=96, height=64, shade=40) -> np.ndarray:
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[...] = (shade, shade, shade, 255)
+    return pixels
+
+
+def apply_rects(reference: np.ndarray, packed: bytes) -> np.ndarray:
+    """What the browser does with a delta: paste every tile over the last frame"""
+    image = reference.copy()
+    (count,) = DELTA_COUNT.unpack_from(packed)
+    offset = DELTA_COUNT.size
+    for _ in range(count):
+        x, y, width, height, length = DELTA_RECT.unpack_from(packed, offset)
+        offset += DELTA_RECT.size
+        with Image.open(io.BytesIO(packed[offset:offset + length])) as tile:
+            image[y:y + height, x:x + width] = np.asarray(tile.convert("RGBA"))
+        offset += length
+    assert offset == len(packed)
+    return image
+
+
+def send(encoder: DeltaEncoder, pixels: np.ndarray):
+    frame = encoder.encode(encode_png(pixels), FrameCodec.PNG)
+    encoder.commit(frame)
+    return frame
+
+
+def test_first_frame_is_a_keyframe_and_an_identical_one_repeats():
+    encoder = DeltaEncoder(tile_size=32)
+    assert send(encoder, solid()).kind == DeltaKind.KEYFRAME
+    assert send(encoder, solid()).kind == DeltaKind.REPEAT
+
+
+def test_delta_sends_only_changed_tiles_and_reconstructs_the_frame():
+    encoder = DeltaEncoder(tile_size=32)
+    reference = solid()
+    send(encoder, reference)
+
+    changed = reference.copy()
+    changed[5:10, 40:70] = (255, 0, 0, 255)
+    frame = send(encoder, changed)
+
+    assert frame.kind == DeltaKind.DELTA
+    # Columns 1 and 2 of the first tile row, merged into one rectangle
+    assert [rect[:4] for rect in frame.rects] == [(32, 0, 64, 32)]
+    np.testing.assert_array_equal(apply_rects(reference, frame.pack_rects()), changed)
+
+
+def test_edge_tiles_are_clipped_to_the_frame():
+    encoder = DeltaEncoder(tile_size=32)
+    reference = solid(width=80, height=50)
+    send(encoder, reference)
+
+    changed = reference.copy()
+    changed[-1, -1] = (0, 0, 255, 255)
+    frame = send(encoder, changed)
+
+    assert [rect[:4] for rect in frame.rects] == [(64, 32, 16, 18)]
+    np.testing.assert_array_equal(apply_rects(reference, frame.pack_rects()), changed)
+
+
+def test_keyframe_when_most_of_the_frame_or_its_size_changed():
+    encoder = DeltaEncoder(tile_size=32, max_changed_ratio=0.5)
+    send(encoder, solid())
+    assert send(encoder, solid(shade=200)).kind == DeltaKind.KEYFRAME
+    assert send(encoder, solid(width=64)).kind == DeltaKind.KEYFRAME
+
+
+def test_keyframe_interval_and_uncommitted_frames():
+    encoder = DeltaEncoder(keyframe_interval=3, tile_size=32)
+    reference = solid()
+    send(encoder, reference)
+
+    changed = reference.copy()
+    changed[0, 0] = (255, 255, 255, 255)
+    # A frame that was never sent does not become the reference
+    assert encoder.encode(encode_png(changed), FrameCodec.PNG).kind == DeltaKind.DELTA
+    assert encoder.encode(encode_png(reference), FrameCodec.PNG).kind == DeltaKind.REPEAT
+
+    assert send(encoder, changed).kind == DeltaKind.DELTA
+    assert send(encoder, changed).kind == DeltaKind.REPEAT
+    assert send(encoder, changed).kind == DeltaKind.KEYFRAME
+
+    encoder.reset()
+    assert send(encoder, changed).kind == DeltaKind.KEYFRAME
@@ -0,0 +1,30 @@
+from app.realtime_engine.preview.frame_index import PlaybackRange
+
+
+def test_bounds_default_to_every_frame():
+    assert PlaybackRange().bounds(10) == (0, 9)
+
+
+def test_bounds_are_clamped_to_the_frames_available():
+    assert PlaybackRange(start_frame=3, end_frame=6).bounds(10) == (3, 6)
+    assert PlaybackRange(start_frame=-5, end_frame=50).bounds(10) == (0, 9)
+    assert PlaybackRange(start_frame=20).bounds(10) == (9, 9)
+    # An end before the start plays the start frame only
+    assert PlaybackRange(start_frame=6, end_frame=2).bounds(10) == (6, 6)
+
+
+def test_bounds_of_a_render_without_frames_are_empty():
+    first, last = PlaybackRange(start_frame=2, end_frame=5).bounds(0)
+    assert last < first
+
+
+def test_from_message_keeps_unspecified_fields_and_flags_seeks():
+    current = PlaybackRange(start_frame=2, end_frame=8, step=2, fps=12, loop=True)
+
+    updated = PlaybackRange.from_message({"fps": 30}, current)
+    assert (updated.start_frame, updated.end_frame, updated.step, updated.fps, updated.loop) == \
+        (2, 8, 2, 30.0, True)
+    assert not updated.seek
+
+    seek = PlaybackRange.from_message({"start_frame": 5, "step": 0}, current)
+    assert seek.start_frame == 5 and seek.step == 1 and seek.seek
@@ -0,0 +1,78 @@
+import json
+import tempfile
+from pathlib import Path
+
+from app.realtime_engine.preview.frame_manifest import FrameManifestReader
+from conftest import ManifestWriter, png
+
+
+def preview_dir() -> Path:
+    return Path(tempfile.mkdtemp())
+
+
+def test_frames_are_read_incrementally_and_the_end_sets_the_status():
+    directory = preview_dir()
+    writer = ManifestWriter(directory, "render-1")
+    reader = FrameManifestReader(directory, "render-1")
+    assert reader.poll() == []
+
+    writer.begin(3)
+    writer.frame(png(10))
+    entries = reader.poll()
+    assert [entry.file for entry in entries] == ["frame_0001.png"]
+    assert entries[0].path == directory / "frame_0001.png"
+    assert reader.render_info["frame_count"] == 3
+
+    writer.frame(png(20))
+    writer.end()
+    assert [entry.index for entry in reader.poll()] == [1]
+    assert reader.finished and reader.status == "completed"
+    assert len(reader.entries) == 2
+
+
+def test_half_written_line_waits_for_its_end():
+    directory = preview_dir()
+    writer = ManifestWriter(directory, "render-1")
+    reader = FrameManifestReader(directory, "render-1")
+    writer.begin(1)
+    line = json.dumps({"generation": "render-1", "type": "frame", "frame": 1, "index": 0,
+                       "file": "frame_0001.png"}) + "\n"
+
+    with open(writer.path, "a") as f:
+        f.write(line[:20])
+    assert reader.poll() == []
+    with open(writer.path, "a") as f:
+        f.write(line[20:])
+    assert [entry.frame for entry in reader.poll()] == [1]
+
+
+def test_records_of_another_render_are_ignored():
+    directory = preview_dir()
+    reader = FrameManifestReader(directory, "render-2")
+    stale = ManifestWriter(directory, "render-1")
+    stale.begin(1)
+    stale.frame(png(10))
+    stale.end()
+
+    assert reader.poll() == []
+    assert not reader.finished
+
+
+def test_replaced_manifest_is_read_from_the_start():
+    directory = preview_dir()
+    reader = FrameManifestReader(directory)
+    first = ManifestWriter(directory, "render-1")
+    first.begin(2)
+    first.frame(png(10))
+    first.frame(png(20))
+    assert len(reader.poll()) == 2
+
+    # The next render rewrites the manifest, shorter than what was read
+    replacement = directory / "manifest.next"
+    replacement.write_text(json.dumps({"generation": "render-1", "type": "begin"}) + "\n")
+    replacement.replace(first.path)
+    second = ManifestWriter(directory, "render-1")
+    second.frame(png(30))
+
+    assert [entry.index for entry in reader.poll()] == [0]
+    assert len(reader.entries) == 1
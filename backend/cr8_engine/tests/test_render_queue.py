@@ -0,0 +1,54 @@
+import asyncio
+
+from app.realtime_engine.websockets.render_queue import RenderQueue
+
+
+def test_request_submitted_during_a_dispatch_does_not_lose_either_render():
+    async def run():
+        queue = RenderQueue(debounce=0)
+        sent = []
+        release = asyncio.Event()
+
+        async def dispatch(request):
+            # What the handler sees in flight when it starts a render
+            sent.append((request["id"], queue.in_flight))
+            if request["id"] == "a":
+                await release.wait()
+            return request["id"]
+
+        queue.submit({"id": "a"}, dispatch)
+        await asyncio.sleep(0.01)
+        queue.submit({"id": "b"}, dispatch)
+        await asyncio.sleep(0.01)
+        # b waits for a's dispatch, which a new request must not cancel
+        assert sent == [("a", None)]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        return queue, sent
+
+    queue, sent = asyncio.run(run())
+    assert sent == [("a", None), ("b", "a")]
+    assert queue.in_flight == "b"
+    assert queue.dispatched == 2
+
+
+def test_requests_within_the_debounce_window_render_once():
+    async def run():
+        queue = RenderQueue(debounce=0.05)
+        sent = []
+
+        async def dispatch(request):
+            sent.append(request["id"])
+            return request["id"]
+
+        for render_id in "abc":
+            queue.submit({"id": render_id}, dispatch)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        return queue, sent
+
+    queue, sent = asyncio.run(run())
+    assert sent == ["c"]
+    assert queue.in_flight == "c"
+    assert queue.superseded == 2
@@ -0,0 +1,80 @@
+import asyncio
+
+from app.realtime_engine.websockets.session_manager import Session, SessionManager, SessionState
+from app.realtime_engine.websockets.websocket_handler import WebSocketHandler
+from app.services.template_ingestion_service import TemplateIngestionService
+from conftest import FakeWebSocket, drain
+
+
+def make_session():
+    manager = SessionManager()
+    controller, viewer = FakeWebSocket("controller"), FakeWebSocket("viewer")
+    session = Session("user", browser_socket=controller)
+    session.state = SessionState.CONNECTED
+    session.blender_socket = FakeWebSocket("blender")
+    session.add_viewer(viewer)
+    manager.sessions["user"] = session
+    return manager, session, controller, viewer
+
+
+def blender_reply(message_id, **fields):
+    return {"command": "template_controls",
+            "data": {"data": {"message_id": message_id, "version": 7, "epoch": "e", **fields}}}
+
+
+def test_delta_goes_only_to_the_viewer_that_asked():
+    async def run():
+        manager, session, controller, viewer = make_session()
+        await WebSocketHandler(manager, "user", viewer).handle_message(
+            "user", {"command": "get_template_controls", "since_version": 5, "epoch": "e"}, "browser")
+        request = session.blender_socket.sent[-1]
+        assert request["since_version"] == 5
+
+        await WebSocketHandler(manager, "user", session.blender_socket).handle_message(
+            "user", blender_reply(request["message_id"], full=False, changed={"lights": []}), "blender")
+        await drain()
+
+        assert viewer.messages(command="template_controls", full=False)
+        assert not controller.messages(command="template_controls")
+        assert request["message_id"] not in session.pending_viewers
+
+    asyncio.run(run())
+
+
+def test_delta_for_a_departed_viewer_is_dropped():
+    async def run():
+        manager, session, controller, viewer = make_session()
+        await WebSocketHandler(manager, "user", viewer).handle_message(
+            "user", {"command": "get_template_controls", "since_version": 5, "epoch": "e"}, "browser")
+        request = session.blender_socket.sent[-1]
+        await session.remove_viewer(viewer)
+
+        await WebSocketHandler(manager, "user", session.blender_socket).handle_message(
+            "user", blender_reply(request["message_id"], full=False, changed={}), "blender")
+        await drain()
+
+        assert not controller.messages(command="template_controls")
+
+    asyncio.run(run())
+
+
+def test_ingested_controls_go_to_the_requesting_viewer(monkeypatch):
+    async def metadata(db, template_id):
+        return {"controllables": {"lights": [{"name": "controllable_key"}]}, "fps": 24}
+
+    monkeypatch.setattr(TemplateIngestionService, "get_template_metadata", metadata)
+    monkeypatch.setattr(
+        "app.realtime_engine.websockets.websocket_handler.get_db", lambda: None)
+
+    async def run():
+        manager, session, controller, viewer = make_session()
+        await WebSocketHandler(manager, "user", viewer).handle_message(
+            "user", {"command": "get_template_controls", "template_id": 3}, "browser")
+        await drain()
+
+        [reply] = viewer.messages(command="template_controls")
+        assert reply["source"] == "template" and reply["template"]["fps"] == 24
+        assert not controller.messages(command="template_controls")
+        assert not session.blender_socket.sent
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+from conftest import load_addon_module
+
+TemplateWizard = load_addon_module("template_wizard").TemplateWizard
+
+
+def light(name, controls=("color", "strength", "temperature")):
+    return {"name": name, "type": "POINT", "supported_controls": list(controls)}
+
+
+def material(name):
+    return {"name": name, "supported_controls": ["color", "roughness", "metallic"]}
+
+
+def scene(lights=(), materials=()):
+    return {"cameras": [], "lights": list(lights), "materials": list(materials), "objects": []}
+
+
+def wizard_with(state):
+    """A wizard whose rescans see whatever state[0] holds"""
+    wizard = TemplateWizard()
+    wizard.scan_controllable_objects = lambda: state[0]
+    return wizard
+
+
+def test_first_rescan_is_a_full_snapshot():
+    wizard = wizard_with([scene(lights=[light("controllable_key")])])
+
+    result = wizard.rescan()
+
+    assert result["full"] and result["version"] == 1
+    assert result["controllables"]["lights"] == [light("controllable_key")]
+
+
+def test_rescan_since_a_version_returns_only_the_differences():
+    state = [scene(lights=[light("controllable_key")], materials=[material("controllable_wall")])]
+    wizard = wizard_with(state)
+    first = wizard.rescan()
+
+    state[0] = scene(lights=[light("controllable_key", ["color"]), light("controllable_fill")])
+    delta = wizard.rescan(first["version"], first["epoch"])
+
+    assert not delta["full"] and delta["version"] == 2
+    assert delta["added"]["lights"] == [light("controllable_fill")]
+    assert delta["changed"]["lights"] == [light("controllable_key", ["color"])]
+    assert delta["removed"]["materials"] == ["controllable_wall"]
+
+    unchanged = wizard.rescan(delta["version"], delta["epoch"])
+    assert unchanged["version"] == 2
+    assert not any(unchanged[kind][category] for kind in ("added", "changed", "removed")
+                   for category in unchanged[kind])
+
+
+def test_controllable_added_and_removed_since_the_client_version_is_not_reported():
+    state = [scene()]
+    wizard = wizard_with(state)
+    first = wizard.rescan()
+    state[0] = scene(lights=[light("controllable_flash")])
+    wizard.rescan()
+    state[0] = scene()
+
+    delta = wizard.rescan(first["version"], first["epoch"])
+
+    assert delta["removed"]["lights"] == []
+    assert delta["added"]["lights"] == []
+
+
+def test_full_snapshot_for_another_epoch_or_a_version_past_the_history():
+    state = [scene(lights=[light("controllable_key")])]
+    wizard = wizard_with(state)
+    wizard.MAX_REMOVED = 1
+    first = wizard.rescan()
+
+    assert wizard.rescan(first["version"], "another-process")["full"]
+    assert wizard.rescan(first["version"] + 5, first["epoch"])["full"]
+
+    # Two removals only keep the second in the history
+    state[0] = scene(lights=[light("controllable_fill")])
+    wizard.rescan()
+    state[0] = scene()
+    wizard.rescan()
+    assert wizard.rescan(first["version"], first["epoch"])["full"]
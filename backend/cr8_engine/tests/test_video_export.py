@@ -0,0 +1,40 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from app.services.video_export_service import VideoExportService, VideoExportStatus, VideoPreset
+
+
+def export(service: VideoExportService, frames, reuse):
+    async def run():
+        job = service.submit("alice", frames, ["a", "b"], 24, [VideoPreset.H264_WEB],
+                             reuse=reuse)
+        await job.task
+        return job
+    return asyncio.run(run())
+
+
+def test_h264_web_export_reuses_the_streamed_preview():
+    root = Path(tempfile.mkdtemp())
+    streamed = root / "preview.mp4"
+    streamed.write_bytes(b"streamed mp4")
+    # Any encode would fail, the export has to come from the streamed file
+    service = VideoExportService(root / "exports", 1, ffmpeg=str(root / "no-ffmpeg"))
+
+    job = export(service, [root / "0.png", root / "1.png"], {VideoPreset.H264_WEB: streamed})
+
+    assert job.status == VideoExportStatus.COMPLETED
+    assert job.frames_encoded == 2
+    output = service.output_path(job.frames_hash, VideoPreset.H264_WEB)
+    assert output.read_bytes() == b"streamed mp4"
+    assert job.outputs == {VideoPreset.H264_WEB: service.relative_output(output)}
+
+
+def test_missing_streamed_preview_falls_back_to_encoding():
+    root = Path(tempfile.mkdtemp())
+    service = VideoExportService(root / "exports", 1, ffmpeg=str(root / "no-ffmpeg"))
+
+    job = export(service, [root / "0.png"], {VideoPreset.H264_WEB: root / "gone.mp4"})
+
+    assert job.status == VideoExportStatus.FAILED
+    assert not service.output_path(job.frames_hash, VideoPreset.H264_WEB).exists()